@@ -5,12 +5,80 @@ AI Tools Installer - Dependency Resolver
 Parses and resolves tool dependencies from INSTALL.md or manifest files.
 """
 
+import os
 import re
+import sys
+from collections import defaultdict
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
-from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+from dataclasses import dataclass, asdict
 
-@dataclass
+from install_common import loads, yaml_loader, tool_cache_file, save_cache
+
+# Optional PEP 508 parser for requirements.txt
+try:
+    from packaging.requirements import Requirement, InvalidRequirement
+except ImportError:
+    Requirement = None
+
+# Parsed results are cached per tool directory and invalidated by file mtimes
+CACHE_DIR = Path.home() / '.cache' / 'aitools' / 'deps'
+CACHE_VERSION = 3  # Bump whenever parsing output changes
+
+# Files inspected for dependency information
+MANIFEST_FILES = ('INSTALL.md', 'package.json', 'requirements.txt', 'README.md')
+_MANIFEST_KEYS = frozenset(name.casefold() for name in MANIFEST_FILES)
+
+_FRONTMATTER_RE = re.compile(r'^---\s*\n(.*?)\n---', re.DOTALL)
+_INSTALL_MD_DEPS_RE = re.compile(r'dependencies:\s*\n((?:  - .+\n?)+)')
+_INSTALL_MD_CONFLICTS_RE = re.compile(r'conflicts:\s*\n((?:  - .+\n?)+)')
+_REQUIREMENT_RE = re.compile(r'([a-zA-Z0-9\-_]+)(.*)')
+_NPM_HINT_RE = re.compile(rb'npm install', re.IGNORECASE)
+_PIP_HINT_RE = re.compile(rb'pip install', re.IGNORECASE)
+
+def _manifest_mtimes(tool_dir: Path) -> Dict[str, int]:
+    """Get modification times of the manifest files that exist, from one directory scan.
+
+    Names are matched case-insensitively (readme.md counts as README.md, as it
+    would on a case-insensitive filesystem) and keyed by their actual spelling.
+    """
+    mtimes = {}
+    try:
+        with os.scandir(tool_dir) as it:
+            for entry in it:
+                if entry.name.casefold() in _MANIFEST_KEYS and entry.is_file():
+                    mtimes[entry.name] = entry.stat().st_mtime_ns
+    except OSError:
+        pass
+    return mtimes
+
+def _manifest_name(mtimes: Dict[str, int], name: str) -> Optional[str]:
+    """Actual spelling of manifest file name in mtimes, preferring an exact match"""
+    if name in mtimes:
+        return name
+    key = name.casefold()
+    return next((actual for actual in sorted(mtimes) if actual.casefold() == key), None)
+
+def _read_bytes(path: Path) -> bytes:
+    """Read a small file with a single open/fstat/read"""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        if size == 0:
+            return b''
+        return os.read(fd, size)
+    finally:
+        os.close(fd)
+
+def _read_text(path: Path) -> str:
+    """Read a small UTF-8 file, see _read_bytes()"""
+    return _read_bytes(path).decode('utf-8', 'replace')
+
+# dataclass() only accepts slots= from Python 3.10 on
+_SLOTS = {'slots': True} if sys.version_info >= (3, 10) else {}
+
+@dataclass(frozen=True, **_SLOTS)
 class Dependency:
     """Represents a dependency"""
     name: str
@@ -25,6 +93,7 @@ class DependencyResolver:
     def __init__(self, tool_dir: Path):
         self.tool_dir = tool_dir
         self.dependencies: List[Dependency] = []
+        self._types_seen: Set[str] = set()
         self.conflicts: List[str] = []
     
     def parse_dependencies(self) -> Tuple[List[Dependency], List[str]]:
@@ -34,125 +103,211 @@ class DependencyResolver:
         Returns:
             (dependencies, conflicts)
         """
+        mtimes = _manifest_mtimes(self.tool_dir)
+        cache_file = tool_cache_file(CACHE_DIR, self.tool_dir)
+        
+        if self._load_cache(cache_file, mtimes):
+            return self.dependencies, self.conflicts
+        
         # Check for INSTALL.md with YAML frontmatter
-        install_md = self.tool_dir / 'INSTALL.md'
-        if install_md.exists():
-            self._parse_install_md(install_md)
+        install_md = _manifest_name(mtimes, 'INSTALL.md')
+        if install_md:
+            self._parse_install_md(self.tool_dir / install_md)
         
         # Check for package.json
-        package_json = self.tool_dir / 'package.json'
-        if package_json.exists():
-            self._parse_package_json(package_json)
+        package_json = _manifest_name(mtimes, 'package.json')
+        if package_json:
+            self._parse_package_json(self.tool_dir / package_json)
         
         # Check for requirements.txt
-        requirements_txt = self.tool_dir / 'requirements.txt'
-        if requirements_txt.exists():
-            self._parse_requirements_txt(requirements_txt)
+        requirements_txt = _manifest_name(mtimes, 'requirements.txt')
+        if requirements_txt:
+            self._parse_requirements_txt(self.tool_dir / requirements_txt)
         
         # Check README for dependency hints
-        readme = self.tool_dir / 'README.md'
-        if readme.exists():
-            self._parse_readme(readme)
+        readme = _manifest_name(mtimes, 'README.md')
+        if readme:
+            self._parse_readme(self.tool_dir / readme)
+        
+        self._save_cache(cache_file, mtimes)
         
         return self.dependencies, self.conflicts
     
+    def _add_dependency(self, dependency: Dependency):
+        """Record a dependency and its type"""
+        self.dependencies.append(dependency)
+        self._types_seen.add(dependency.type)
+    
+    def _load_cache(self, cache_file: Path, mtimes: Dict[str, int]) -> bool:
+        """Load cached results if they are still valid"""
+        try:
+            data = loads(cache_file.read_bytes())
+            if data['version'] != CACHE_VERSION or data['mtimes'] != mtimes:
+                return False
+            self.dependencies = [Dependency(**d) for d in data['dependencies']]
+            self._types_seen = {d.type for d in self.dependencies}
+            self.conflicts = list(data['conflicts'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return False
+        return True
+    
+    def _save_cache(self, cache_file: Path, mtimes: Dict[str, int]):
+        """Save parsed results for later runs"""
+        data = {
+            'version': CACHE_VERSION,
+            'mtimes': mtimes,
+            'dependencies': [asdict(d) for d in self.dependencies],
+            'conflicts': self.conflicts,
+        }
+        save_cache(cache_file, data)
+    
     def _parse_install_md(self, install_md: Path):
         """Parse INSTALL.md with YAML frontmatter"""
-        content = install_md.read_text()
+        content = _read_text(install_md)
         
         # Extract YAML frontmatter
-        yaml_match = re.match(r'^---\s*\n(.*?)\n---', content, re.DOTALL)
-        if yaml_match:
-            yaml_content = yaml_match.group(1)
-            
-            # Parse dependencies section
-            deps_match = re.search(r'dependencies:\s*\n((?:  - .+\n?)+)', yaml_content)
-            if deps_match:
-                deps_text = deps_match.group(1)
-                for line in deps_text.strip().split('\n'):
-                    line = line.strip('- ').strip()
-                    if ':' in line:
-                        dep_spec, version = line.split(':', 1)
-                        dep_spec = dep_spec.strip()
-                        version = version.strip().strip('"\'')
-                        
-                        # Determine type
-                        if '/' in dep_spec and ('github' in dep_spec or 'http' in dep_spec):
-                            dep_type = 'tool'
-                            url = dep_spec if dep_spec.startswith('http') else f"https://github.com/{dep_spec}"
-                            name = dep_spec.split('/')[-1]
-                        else:
-                            dep_type = 'system'
-                            url = None
-                            name = dep_spec
-                        
-                        self.dependencies.append(Dependency(
-                            name=name,
-                            type=dep_type,
-                            version_spec=version,
-                            url=url
-                        ))
-            
-            # Parse conflicts
-            conflicts_match = re.search(r'conflicts:\s*\n((?:  - .+\n?)+)', yaml_content)
-            if conflicts_match:
-                conflicts_text = conflicts_match.group(1)
-                for line in conflicts_text.strip().split('\n'):
-                    conflict = line.strip('- ').strip()
-                    self.conflicts.append(conflict)
+        yaml_match = _FRONTMATTER_RE.match(content)
+        if not yaml_match:
+            return
+        
+        yaml_content = yaml_match.group(1)
+        try:
+            import yaml  # Only tools with INSTALL.md frontmatter need it
+        except ImportError:
+            # PyYAML is optional here, the line-based reader covers the common layout
+            self._parse_install_md_lines(yaml_content)
+            return
+        try:
+            # The base loader keeps versions like 3.10 or >=18 exactly as written
+            data = yaml.load(yaml_content, Loader=yaml_loader(verbatim=True))
+        except yaml.YAMLError:
+            # Not valid YAML (e.g. "- node: >=18"), read it line by line instead
+            self._parse_install_md_lines(yaml_content)
+            return
+        if not isinstance(data, dict):
+            return
+        
+        # Parse dependencies section
+        # Entries are either "spec: version" maps or bare "spec" strings
+        dependencies = data.get('dependencies')
+        for entry in dependencies if isinstance(dependencies, list) else []:
+            if isinstance(entry, dict):
+                for dep_spec, version in entry.items():
+                    self._add_install_md_dependency(dep_spec, version)
+            elif isinstance(entry, str) and entry:
+                self._add_install_md_dependency(entry, None)
+        
+        # Parse conflicts
+        conflicts = data.get('conflicts')
+        for conflict in conflicts if isinstance(conflicts, list) else []:
+            if isinstance(conflict, str) and conflict:
+                self.conflicts.append(conflict)
+    
+    def _parse_install_md_lines(self, yaml_content: str):
+        """Extract "  - spec: version" dependencies and "  - name" conflicts without a YAML parser"""
+        deps_match = _INSTALL_MD_DEPS_RE.search(yaml_content)
+        if deps_match:
+            for line in deps_match.group(1).strip().split('\n'):
+                line = line.strip('- ').strip()
+                if ':' in line:
+                    dep_spec, version = line.split(':', 1)
+                    self._add_install_md_dependency(dep_spec, version.strip().strip('"\''))
+        
+        conflicts_match = _INSTALL_MD_CONFLICTS_RE.search(yaml_content)
+        if conflicts_match:
+            for line in conflicts_match.group(1).strip().split('\n'):
+                self.conflicts.append(line.strip('- ').strip())
+    
+    def _add_install_md_dependency(self, dep_spec: str, version):
+        """Add a dependency declared in INSTALL.md frontmatter"""
+        dep_spec = dep_spec.strip()
+        
+        # Determine type
+        if '/' in dep_spec and ('github' in dep_spec or 'http' in dep_spec):
+            dep_type = 'tool'
+            url = dep_spec if dep_spec.startswith('http') else f"https://github.com/{dep_spec}"
+            name = dep_spec.split('/')[-1]
+        else:
+            dep_type = 'system'
+            url = None
+            name = dep_spec
+        
+        self._add_dependency(Dependency(
+            name=name,
+            type=dep_type,
+            version_spec=version if isinstance(version, str) else None,
+            url=url
+        ))
     
     def _parse_package_json(self, package_json: Path):
         """Parse package.json for npm dependencies"""
         try:
-            import json
-            data = json.loads(package_json.read_text())
-            
-            # Check dependencies
-            for dep_type in ['dependencies', 'devDependencies']:
-                if dep_type in data:
-                    for name, version in data[dep_type].items():
-                        self.dependencies.append(Dependency(
-                            name=name,
-                            type='npm',
-                            version_spec=version
-                        ))
-        except:
-            pass
+            data = loads(_read_bytes(package_json))
+        except (OSError, ValueError):
+            return
+        if not isinstance(data, dict):
+            return
+        
+        # Check dependencies
+        for dep_type in ['dependencies', 'devDependencies']:
+            deps = data.get(dep_type)
+            if isinstance(deps, dict):
+                for name, version in deps.items():
+                    self._add_dependency(Dependency(
+                        name=name,
+                        type='npm',
+                        version_spec=version if isinstance(version, str) else None
+                    ))
     
     def _parse_requirements_txt(self, requirements_txt: Path):
         """Parse requirements.txt for pip dependencies"""
-        content = requirements_txt.read_text()
-        for line in content.split('\n'):
-            line = line.strip()
-            if line and not line.startswith('#'):
+        content = _read_text(requirements_txt)
+        for line in content.splitlines():
+            line = line.split(' #', 1)[0].strip()
+            
+            # Skip comments, pip options (-r, -e, --index-url) and URL requirements
+            if not line or line.startswith(('#', '-', 'git+', 'http://', 'https://')):
+                continue
+            
+            if Requirement is not None:
+                # PEP 508 parsing handles extras, markers and direct references
+                try:
+                    requirement = Requirement(line)
+                except InvalidRequirement:
+                    continue
+                name = requirement.name
+                version = str(requirement.specifier)
+            else:
                 # Parse requirement spec (e.g., "package>=1.0.0")
-                match = re.match(r'([a-zA-Z0-9\-_]+)(.*)', line)
-                if match:
-                    name = match.group(1)
-                    version = match.group(2).strip()
-                    
-                    self.dependencies.append(Dependency(
-                        name=name,
-                        type='pip',
-                        version_spec=version if version else None
-                    ))
+                match = _REQUIREMENT_RE.match(line)
+                if not match:
+                    continue
+                name = match.group(1)
+                version = match.group(2).strip()
+            
+            self._add_dependency(Dependency(
+                name=name,
+                type='pip',
+                version_spec=version if version else None
+            ))
     
     def _parse_readme(self, readme: Path):
         """Parse README for dependency hints"""
-        content = readme.read_text().lower()
+        # Search the raw bytes case-insensitively instead of decoding and lowercasing a copy
+        content = _read_bytes(readme)
         
         # Look for common patterns
-        if 'npm install' in content:
-            if not any(d.type == 'npm' for d in self.dependencies):
-                self.dependencies.append(Dependency(
+        if _NPM_HINT_RE.search(content):
+            if 'npm' not in self._types_seen:
+                self._add_dependency(Dependency(
                     name='npm-packages',
                     type='npm',
                     version_spec=None
                 ))
         
-        if 'pip install' in content:
-            if not any(d.type == 'pip' for d in self.dependencies):
-                self.dependencies.append(Dependency(
+        if _PIP_HINT_RE.search(content):
+            if 'pip' not in self._types_seen:
+                self._add_dependency(Dependency(
                     name='python-packages',
                     type='pip',
                     version_spec=None
@@ -166,8 +321,19 @@ def check_dependencies(tool_dir: Path) -> Tuple[List[Dependency], List[str]]:
     Returns:
         (dependencies, conflicts)
     """
-    resolver = DependencyResolver(tool_dir)
-    return resolver.parse_dependencies()
+    mtimes = tuple(sorted(_manifest_mtimes(tool_dir).items()))
+    deps, conflicts = _check_dependencies_cached(str(tool_dir), mtimes)
+    
+    # Return copies so callers can't mutate the memoized results
+    return list(deps), list(conflicts)
+
+
+@lru_cache(maxsize=256)
+def _check_dependencies_cached(tool_dir: str, mtimes: Tuple) -> Tuple[Tuple[Dependency, ...], Tuple[str, ...]]:
+    """Parse dependencies once per (directory, manifest mtimes) within a process"""
+    resolver = DependencyResolver(Path(tool_dir))
+    deps, conflicts = resolver.parse_dependencies()
+    return tuple(deps), tuple(conflicts)
 
 
 def format_dependencies_report(dependencies: List[Dependency], conflicts: List[str]) -> str:
@@ -177,10 +343,8 @@ def format_dependencies_report(dependencies: List[Dependency], conflicts: List[s
     if dependencies:
         lines.append("\n📦 Dependencies:")
         
-        by_type = {}
+        by_type = defaultdict(list)
         for dep in dependencies:
-            if dep.type not in by_type:
-                by_type[dep.type] = []
             by_type[dep.type].append(dep)
         
         for dep_type, deps in by_type.items():
@@ -198,8 +362,6 @@ def format_dependencies_report(dependencies: List[Dependency], conflicts: List[s
 
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) < 2:
         print("Usage: python dependency_resolver.py <tool_directory>")
         sys.exit(1)
@@ -1,23 +1,28 @@
 #!/usr/bin/env python3
+import atexit
+import contextlib
+import errno
+import io
 import os
+import re
+import functools
 import sys
 import subprocess
-import shutil
-import argparse
+import shlex
+import stat
+import threading
+from collections import deque
 from pathlib import Path
 
-# Import validation, transaction, logging, dependency, and security systems
+# Import logging, dependency, and security systems
+# (validation and transactions are imported on first use, see _load_validation())
 try:
-    from install_validator import run_validation
-    from install_transaction import InstallTransaction
     from install_logger import InstallLogger
     from dependency_resolver import check_dependencies, format_dependencies_report
     from security_scanner import scan_tool_security, format_security_report
-    VALIDATION_AVAILABLE = True
     LOGGING_AVAILABLE = True
     ADVANCED_FEATURES = True
 except ImportError as e:
-    VALIDATION_AVAILABLE = False
     LOGGING_AVAILABLE = False
     ADVANCED_FEATURES = False
     print(f"⚠️  Advanced features not available: {e}")
@@ -39,128 +44,539 @@ DESTINATION_MAP = {
     "prompts":  [OPENCODE_DIR / "prompts",  CODEX_DIR / "prompts",  GEMINI_DIR / "prompts"]
 }
 
-def run_command(cmd, cwd=None, quiet=False):
+# Environments to install into, detected once at startup.
+# Always install for OpenCode as primary.
+# For Codex/Gemini, we only install if user has them set up.
+ACTIVE_ENVS = [("opencode", OPENCODE_DIR)] + [
+    (env, env_dir) for env, env_dir in (("codex", CODEX_DIR), ("gemini", GEMINI_DIR)) if env_dir.exists()
+]
+
+# DESTINATION_MAP restricted to the active environments
+ACTIVE_DESTINATIONS = {
+    c_type: [dest for dest in dests if any(dest.parent == env_dir for _, env_dir in ACTIVE_ENVS)]
+    for c_type, dests in DESTINATION_MAP.items()
+}
+
+# Files checked (in order) for a tool description
+README_FILES = ("README.md", "README_CN.md", "SKILL.md", "README.txt")
+README_MAX_BYTES = 1 << 20
+README_HEAD_CHARS = 8192  # The description is always near the top
+# Descriptions are cached across runs per tool directory and invalidated by README mtimes
+DESCRIPTION_CACHE_FILE = Path.home() / ".cache" / "aitools" / "descriptions.json"
+DESCRIPTION_CACHE_VERSION = 1  # Bump whenever description extraction changes
+
+_HEADING_RE = re.compile(r'^[ \t]*#.*$', re.MULTILINE)
+_SKIPPED_LINE_RE = re.compile(r'^[ \t]*(?:#|---).*(?:\n|\Z)', re.MULTILINE)
+_BLANK_LINE_RE = re.compile(r'\n[ \t]*\n')
+
+# Component folder names, for O(1) lookups during discovery
+COMPONENT_TYPES = frozenset(DESTINATION_MAP)
+
+# Directories never searched for components
+SKIP_DIRS = frozenset({'node_modules', 'dist', 'build', 'vendor', '__pycache__'})
+
+# Component types whose items are directories or single files with these extensions
+_ITEM_DIR_TYPES = frozenset({'skills', 'agents', 'plugins', 'mcp'})
+_ITEM_SUFFIXES = frozenset({'md', 'json', 'py', 'js'})
+
+# https/ssh/scp-style git URLs -> host, owner, repo (with or without .git)
+_URL_RE = re.compile(r'(?:git@|https?://(?:[^@/]+@)?|git://|ssh://(?:[^@/]+@)?)([^/:]+)[/:]([^/]+)/([^/]+?)(?:\.git)?/?$')
+
+# Full SHA-1 or SHA-256 object names, as stored in .git ref files
+_SHA_RE = re.compile(r'[0-9a-f]{40}(?:[0-9a-f]{24})?')
+
+# Output templates, built once instead of as f-strings on every install
+_MESSAGES = {
+    "processing":        "🔧 \033[1mProcessing {}\033[0m ({})...",
+    "dry_run":           "\n🔍 \033[1mDry-Run Preview\033[0m",
+    "linked":            "     ✅ Linked \033[36m{}\033[0m from {}",
+    "installed":         "\n✨ \033[32mSuccessfully Installed {}\033[0m",
+    "description":       "📖 \033[3m{}\033[0m\n",
+    "capabilities":      "🔎 \033[1mCapabilities Installed:\033[0m",
+    "capability":        "   • \033[1m{}\033[0m: {}",
+    "how_to_validate":   "\n🚀 \033[1mHow to Validate:\033[0m",
+    "skill_hint":        "   ▶ Skill: Ask \033[33m'Help me using {0}'\033[0m or run \033[33m/skill run {0}\033[0m",
+    "agent_hint":        "   ▶ Agent: Type \033[33m@{}\033[0m to switch to this agent.",
+    "command_hint":      "   ▶ Command: Type \033[33m/{} --help\033[0m",
+    "plugin_hint":       "   ▶ Check plugins: \033[33m/plugin list\033[0m",
+    "validation":        "\n🔍 \033[1mPhase 4: Validation\033[0m",
+    "validation_failed": "\n❌ \033[31mValidation failed!\033[0m",
+    "rollback_hint":     "   \033[33mpython install_transaction.py rollback {}\033[0m",
+    "validation_passed": "\n✅ \033[32mValidation passed!\033[0m",
+}
+
+# Honour NO_COLOR (https://no-color.org) by stripping the escape codes once
+if os.environ.get("NO_COLOR"):
+    _ANSI_RE = re.compile(r"\033\[[0-9;]*m")
+    _MESSAGES = {key: _ANSI_RE.sub("", template) for key, template in _MESSAGES.items()}
+
+# Guards manifest read-modify-write cycles across parallel installs
+_MANIFEST_LOCK = threading.Lock()
+_DESCRIPTION_CACHE_LOCK = threading.Lock()
+# Set once the description cache needs writing back, see _mark_description_cache_dirty()
+_description_cache_dirty = False
+
+# Destination directories known to exist, see create_destination_dirs()
+_ensured_parents = set()
+
+class _ThreadOutput:
+    """Stdout proxy that buffers writes from threads running under capture()."""
+    
+    def __init__(self, stream):
+        self.stream = stream
+        self._local = threading.local()
+    
+    def capture(self, func, *args, **kwargs):
+        """Run func, returning (captured output, exception or None)."""
+        buffer = self._local.buffer = io.StringIO()
+        error = None
+        try:
+            func(*args, **kwargs)
+        except Exception as e:
+            error = e
+        finally:
+            del self._local.buffer
+        return buffer.getvalue(), error
+    
+    def write(self, text):
+        buffer = getattr(self._local, 'buffer', None)
+        if buffer is None:
+            return self.stream.write(text)
+        return buffer.write(text)
+    
+    def flush(self):
+        if getattr(self._local, 'buffer', None) is None:
+            self.stream.flush()
+    
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+class OutputBuffer:
+    """Collects the lines of an output block and writes them with a single write() call."""
+    __slots__ = ('lines',)
+    
+    def __init__(self):
+        self.lines = []
+    
+    def __call__(self, *args):
+        self.lines.append(" ".join(str(arg) for arg in args))
+    
+    def flush(self):
+        if self.lines:
+            sys.stdout.write("\n".join(self.lines) + "\n")
+            sys.stdout.flush()
+            self.lines.clear()
+
+@functools.lru_cache(maxsize=1)
+def _load_validation():
+    """Import the validation and transaction systems, or return None if unavailable."""
+    # Deferred so --help, dry runs and empty --all runs don't pay for them (and yaml)
+    try:
+        from install_validator import run_validation
+        from install_transaction import InstallTransaction
+    except ImportError as e:
+        print(f"⚠️  Validation not available: {e}")
+        return None
+    return run_validation, InstallTransaction
+
+def run_command(argv, cwd=None, quiet=False):
+    """Run a command given as an argv list (no shell). Returns True on success."""
+    output = subprocess.DEVNULL if quiet else None
     try:
-        kwargs = {}
-        if quiet:
-            kwargs['stdout'] = subprocess.DEVNULL
-            kwargs['stderr'] = subprocess.DEVNULL
-        subprocess.check_call(cmd, shell=True, cwd=cwd, **kwargs)
-    except subprocess.CalledProcessError as e:
+        subprocess.run(argv, cwd=cwd, check=True, stdout=output, stderr=output)
+    except (subprocess.CalledProcessError, OSError) as e:
         if not quiet:
-            print(f"Error running command: {cmd}\n{e}")
+            print(f"Error running command: {shlex.join(argv)}\n{e}")
         return False
     return True
 
-def find_components(root_dir):
-    """Recursively find component directories (up to depth 3) to handle varying structures."""
+def find_components(root_dir, root_files=None):
+    """Recursively find component directories (up to depth 3) to handle varying structures.
+
+    If a set is passed as root_files, the names of the files in root_dir are added to it.
+    """
     components = {}
-    root_path = Path(root_dir)
     
-    # Priority folders to look for at root first
-    for key in DESTINATION_MAP.keys():
-        direct_path = root_path / key
-        if direct_path.is_dir():
-            components[key] = direct_path
-
-    # Deep search if not found at root (or to find additional ones, though usually one per repo)
+    # Breadth-first scan so components at root take priority over nested ones.
     # We limit depth to avoid deep 'node_modules' scanning
-    for root, dirs, files in os.walk(root_dir):
-        # Skip hidden and annoying dirs
-        dirs[:] = [d for d in dirs if not d.startswith('.') and d not in ['node_modules', 'dist', 'build', 'vendor']]
-        
-        rel_level = str(Path(root).relative_to(root_dir)).count(os.sep)
-        if rel_level > 2: # Max depth 2
+    pending = deque([(root_dir, 0)])
+    while pending:
+        path, depth = pending.popleft()
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
             continue
-            
-        for d in dirs:
-            if d in DESTINATION_MAP and d not in components:
-                 components[d] = Path(root) / d
+        if depth == 0 and root_files is not None:
+            root_files.update(entry.name for entry in entries if entry.is_file())
+        
+        for entry in entries:
+            # DirEntry caches the file type, so this only stats symlinks
+            if not entry.is_dir():
+                continue
+            if entry.name in COMPONENT_TYPES and entry.name not in components:
+                components[entry.name] = Path(entry.path)
+                # Nothing left to look for
+                if len(components) == len(COMPONENT_TYPES):
+                    return components
+
+            # Skip hidden and annoying dirs, and don't descend into symlinks
+            if depth >= 3 or entry.is_symlink():
+                continue
+            if entry.name[:1] != '.' and entry.name not in SKIP_DIRS:
+                pending.append((entry.path, depth + 1))
     
     return components
 
-def get_tool_description(dir_path):
+@functools.lru_cache(maxsize=None)
+def _description_cache():
+    """Descriptions from earlier runs, {dir_path: [mtimes, description]}, loaded once.
+
+    Entries for tool directories that no longer exist are dropped.
+    """
+    import json
+    try:
+        data = json.loads(DESCRIPTION_CACHE_FILE.read_text())
+        if data["version"] != DESCRIPTION_CACHE_VERSION:
+            return {}
+        cache = dict(data["entries"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return {}
+    live = {key: entry for key, entry in cache.items() if os.path.isdir(key)}
+    if len(live) != len(cache):
+        _mark_description_cache_dirty()
+    return live
+
+def _mark_description_cache_dirty():
+    """Write the description cache once, at exit, however many entries change (hold _DESCRIPTION_CACHE_LOCK)."""
+    global _description_cache_dirty
+    if not _description_cache_dirty:
+        _description_cache_dirty = True
+        atexit.register(_flush_description_cache)
+
+def _flush_description_cache():
+    with _DESCRIPTION_CACHE_LOCK:
+        _save_description_cache(_description_cache())
+
+def _save_description_cache(cache):
+    import json
+    try:
+        DESCRIPTION_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp_file = DESCRIPTION_CACHE_FILE.with_suffix(".tmp")
+        tmp_file.write_text(json.dumps({"version": DESCRIPTION_CACHE_VERSION, "entries": cache}))
+        os.replace(tmp_file, DESCRIPTION_CACHE_FILE)
+    except OSError:
+        pass  # Caching is best-effort
+
+def get_tool_description(dir_path, root_files=None):
+    # Cached on README mtimes, so unchanged tools never reopen their README
+    if root_files is None:
+        # One directory listing instead of a stat per candidate name
+        try:
+            root_files = set(os.listdir(dir_path))
+        except OSError:
+            root_files = set()
+    # Names match case-insensitively (Readme.md is README.md), preferring the exact spelling
+    by_key = {}
+    for name in sorted(root_files):
+        by_key.setdefault(name.casefold(), name)
+    names = []
+    mtimes = []
+    for readme in README_FILES:
+        name = readme if readme in root_files else by_key.get(readme.casefold())
+        # We already know which files exist, don't stat the rest
+        if name is None:
+            names.append(None)
+            mtimes.append(None)
+            continue
+        try:
+            st = (dir_path / name).stat()
+        except OSError:
+            st = None
+        # Skip pathological multi-megabyte files; the description is in the first lines anyway
+        names.append(name)
+        mtimes.append(st.st_mtime_ns if st and st.st_size < README_MAX_BYTES else None)
+    
+    key = str(dir_path)
+    with _DESCRIPTION_CACHE_LOCK:
+        cache = _description_cache()
+        entry = cache.get(key)
+        if isinstance(entry, list) and len(entry) == 2 and entry[0] == mtimes:
+            return entry[1]
+    
+    desc = _read_tool_description(key, names, mtimes)
+    with _DESCRIPTION_CACHE_LOCK:
+        cache[key] = [mtimes, desc]
+        _mark_description_cache_dirty()
+    return desc
+
+def _read_tool_description(dir_path, names, mtimes):
     desc = "No description available."
-    for readme in ["README.md", "README_CN.md", "SKILL.md", "README.txt"]:
-        readme_path = dir_path / readme
-        if readme_path.exists():
+    for name, mtime in zip(names, mtimes):
+        if mtime is not None:
+            readme_path = Path(dir_path) / name
             try:
-                with open(readme_path, 'r', encoding='utf-8') as f:
-                    lines = f.readlines()
-                    paragraph = []
-                    # Simple heuristic to find first paragraph
-                    start = False
-                    for line in lines:
-                        if line.strip().startswith('---'): continue # Skip frontmatter
-                        if line.strip().startswith('#'): 
-                            start = True
-                            continue
-                        if start and line.strip():
-                            paragraph.append(line.strip())
-                        if start and paragraph and not line.strip():
-                            break
-                    if paragraph:
-                        return " ".join(paragraph)[:200] + "..."
+                # Simple heuristic: the first paragraph after the first heading,
+                # found with a few regex passes over the head of the file.
+                with open(readme_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    text = f.read(README_HEAD_CHARS)
+                heading = _HEADING_RE.search(text)
+                if heading:
+                    # Headings and frontmatter fences don't end a paragraph, they're just skipped
+                    body = _SKIPPED_LINE_RE.sub('', text[heading.end():]).strip()
+                    block = _BLANK_LINE_RE.split(body, 1)[0]
+                    if block:
+                        return " ".join(line.strip() for line in block.splitlines())[:200] + "..."
             except Exception:
                 pass
     return desc
 
+def create_destination_dirs(component_types):
+    """Create all destination directories for the given components in one pass."""
+    needed_parents = {
+        dest_parent
+        for c_type in component_types
+        for dest_parent in ACTIVE_DESTINATIONS.get(c_type, [])
+    }
+    # Batch updates ask for the same parents for every tool, only check each one once per run
+    for dest_parent in needed_parents - _ensured_parents:
+        if not dest_parent.is_dir():
+            dest_parent.mkdir(parents=True, exist_ok=True)
+        _ensured_parents.add(dest_parent)
+
+def _link_one(source_path, link_name):
+    """Point link_name at source_path (a str), backing up a real directory in the way."""
+    # Smart Backup & Overwrite (one lstat instead of is_symlink/is_file/is_dir)
+    try:
+        st = os.lstat(link_name)
+    except FileNotFoundError:
+        # First install: nothing to replace, so link directly (no temp name and rename)
+        try:
+            os.symlink(source_path, link_name)
+            return
+        except FileExistsError:
+            st = os.lstat(link_name)  # Created meanwhile, replace it below
+    
+    if stat.S_ISLNK(st.st_mode):
+        # Re-installs usually find the link already correct, leave it alone
+        if os.readlink(link_name) == source_path:
+            return
+    elif stat.S_ISDIR(st.st_mode):
+        backup_name = f"{link_name}.bak.{int(st.st_mtime)}"
+        print(f"    ⚠️  [Backup] Moving existing {link_name} -> {backup_name}")
+        try:
+            os.rename(link_name, backup_name)
+        except OSError as e:
+            # Same directory means same filesystem, but stay safe on exotic mounts
+            if e.errno != errno.EXDEV:
+                raise
+            import shutil
+            shutil.move(str(link_name), backup_name)
+    
+    # Create the link under a temporary name and rename it into place,
+    # so an existing link or file is replaced atomically
+    tmp_name = link_name.parent / f".{link_name.name}.tmp-{os.getpid()}"
+    try:
+        os.unlink(tmp_name)
+    except FileNotFoundError:
+        pass
+    os.symlink(source_path, tmp_name)
+    os.replace(tmp_name, link_name)
+
 def link_component(source_path, component_type, tool_name):
-    targets = DESTINATION_MAP.get(component_type, [])
+    # Destination directories must already exist, see create_destination_dirs()
     linked_to = []
-    
-    for dest_parent in targets:
-        # Only link if the destination parent directory actually exists (is supported by the env)
-        # OR force create for OpenCode as primary. 
-        # For Codex/Gemini, we only installed if user has them set up.
-        if "opencode" in str(dest_parent) or dest_parent.parent.exists():
-            if not dest_parent.exists():
-                dest_parent.mkdir(parents=True, exist_ok=True)
-            
-            link_name = dest_parent / tool_name
-            
-            # Smart Backup & Overwrite
-            if link_name.is_symlink() or link_name.is_file():
-                link_name.unlink()
-            elif link_name.is_dir():
-                timestamp = int(os.path.getmtime(link_name))
-                backup_name = link_name.with_suffix(f".bak.{timestamp}")
-                print(f"    ⚠️  [Backup] Moving existing {link_name} -> {backup_name}")
-                shutil.move(str(link_name), str(backup_name))
-            
-            os.symlink(source_path, link_name)
-            linked_to.append(str(dest_parent))
-            
+    # Converted once, not on every readlink comparison and symlink call
+    source_path = os.fspath(source_path)
+    for dest_parent in ACTIVE_DESTINATIONS.get(component_type, []):
+        _link_one(source_path, dest_parent / tool_name)
+        linked_to.append(str(dest_parent))
     return linked_to
 
 def get_component_items(path, c_type):
     """List specific items (skills/agents names) within a component directory."""
     items = []
-    if not path.is_dir(): return items
+    # DirEntry caches the file type, so is_file/is_dir below don't stat again
+    try:
+        with os.scandir(path) as it:
+            entries = [entry for entry in it if not entry.name.startswith('.')]
+    except OSError:
+        return items
     
-    for item in path.iterdir():
-        if item.name.startswith('.'): continue
-        if c_type in ['commands']:
+    for entry in entries:
+        if c_type == 'commands':
             # For commands, any file that is executable or script is a command
-            if item.is_file():
-                items.append(item.name)
-        elif c_type in ['skills', 'agents', 'plugins', 'mcp']:
+            if entry.is_file():
+                items.append(entry.name)
+        elif c_type in _ITEM_DIR_TYPES:
             # Usually directories
-            if item.is_dir():
-                items.append(item.name)
+            if entry.is_dir():
+                items.append(entry.name)
             # Agents/Skills can sometimes be single files
-            elif item.is_file() and item.suffix in ['.md', '.json', '.py', '.js']:
-                 items.append(item.stem)
-    return sorted(items)
+            elif entry.is_file():
+                stem, dot, suffix = entry.name.rpartition('.')
+                if dot and suffix in _ITEM_SUFFIXES:
+                    items.append(stem)
+    return sorted(items, key=str.casefold)
 
+@functools.lru_cache(maxsize=None)
 def get_remote_url(repo_dir):
+    # Origin URLs don't change during a run, so ask git at most once per repo
     try:
         url = subprocess.check_output(["git", "remote", "get-url", "origin"], cwd=repo_dir, stderr=subprocess.DEVNULL).decode().strip()
         return url
-    except:
+    except (subprocess.CalledProcessError, OSError):
         return None
 
-def install_tool(repo_url, name=None, only_clone=False, only_link=False, validate=True, backup=True, dry_run=False, interactive=False):
+@functools.lru_cache(maxsize=256)
+def canonical_url(url):
+    """Reduce equivalent repo URLs to one comparable form, (host, owner, repo) when recognised."""
+    match = _URL_RE.match(url)
+    if match:
+        return tuple(part.lower() for part in match.groups())
+    # Local paths and other oddities: just ignore case, trailing slash and .git
+    url = url.rstrip('/').lower()
+    return url[:-4] if url.endswith('.git') else url
+
+def _remote_head(repo_dir):
+    """SHA the remote's HEAD points at, from a single ref advertisement (no fetch)."""
+    try:
+        out = subprocess.check_output(["git", "ls-remote", "origin", "HEAD"], cwd=repo_dir, stderr=subprocess.DEVNULL)
+        return out.split()[0].decode()
+    except (subprocess.CalledProcessError, OSError, IndexError):
+        return None
+
+def _read_head_file(repo_dir):
+    """HEAD's SHA read straight from .git (loose or packed ref), or None if that's not possible."""
+    git_dir = os.path.join(repo_dir, ".git")
+    try:
+        with open(os.path.join(git_dir, "HEAD")) as f:
+            head = f.read().strip()
+        if not head.startswith("ref: "):
+            return head if _SHA_RE.fullmatch(head) else None
+        ref = head[5:]
+        try:
+            with open(os.path.join(git_dir, ref)) as f:
+                sha = f.read().strip()
+            return sha if _SHA_RE.fullmatch(sha) else None
+        except FileNotFoundError:
+            with open(os.path.join(git_dir, "packed-refs")) as f:
+                for line in f:
+                    sha, _, name = line.rstrip("\n").partition(" ")
+                    if name == ref and _SHA_RE.fullmatch(sha):
+                        return sha
+    except OSError:
+        pass  # .git is a file (worktree/submodule), or refs live somewhere unusual
+    return None
+
+def _local_head(repo_dir):
+    # Reading the ref files saves spawning git for every up-to-date check
+    head = _read_head_file(repo_dir)
+    if head:
+        return head
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], cwd=repo_dir, stderr=subprocess.DEVNULL).decode().strip()
+    except (subprocess.CalledProcessError, OSError):
+        return None
+
+def is_up_to_date(repo_dir):
+    """Check whether a pull can be skipped because the remote HEAD is already checked out."""
+    if os.environ.get("AITOOLS_NO_LS_REMOTE_FAST_PATH"):
+        return False
+    remote = _remote_head(repo_dir)
+    return remote is not None and remote == _local_head(repo_dir)
+
+def _git_output(args, cwd):
+    return subprocess.check_output(["git", *args], cwd=cwd, stderr=subprocess.DEVNULL).decode().split()
+
+def _reset_blocker(target_dir, expected_head=None):
+    """Check that the checkout is still what the installer left before moving it.
+
+    Returns (reason, None) when moving it could lose work, else (None, tracking_ref).
+    expected_head is the SHA the installer last checked out.
+    """
+    try:
+        if _git_output(["status", "--porcelain", "--untracked-files=no"], target_dir):
+            return "local changes", None
+    except (subprocess.CalledProcessError, OSError):
+        return "git status failed", None
+    
+    # The clone checked out origin's default branch and recorded it as origin/HEAD.
+    # One rev-parse gives both SHAs, then both symbolic names.
+    try:
+        head, tracking_head, branch, tracking_ref = _git_output(
+            ["rev-parse", "HEAD", "refs/remotes/origin/HEAD",
+             "--symbolic-full-name", "HEAD", "refs/remotes/origin/HEAD"], target_dir)
+    except (subprocess.CalledProcessError, OSError, ValueError):
+        return "no origin/HEAD to compare with", None
+    if not branch.startswith("refs/heads/"):
+        return "detached HEAD", None
+    cloned_branch = tracking_ref[len("refs/remotes/origin/"):]
+    if branch[len("refs/heads/"):] != cloned_branch:
+        return f"on branch '{branch[len('refs/heads/'):]}', not '{cloned_branch}'", None
+    if head not in (tracking_head, expected_head):
+        return "local commits", None
+    return None, tracking_ref
+
+def update_repository(target_dir, full_history=False, expected_head=None):
+    """Bring an existing checkout up to date with origin.
+
+    Returns None on success, otherwise why the checkout was left as it is.
+    """
+    if full_history:
+        return None if run_command(["git", "pull"], cwd=target_dir, quiet=True) else "git pull failed"
+    
+    # Installed tools are disposable checkouts: fetch just the new tip and move to it,
+    # no history download and no merge. That is only done while the checkout is still
+    # exactly what the installer left, so local edits, commits and branches are kept.
+    reason, tracking_ref = _reset_blocker(target_dir, expected_head)
+    if reason:
+        return reason
+    # Fetching into the tracking ref keeps it at the commit the checkout was last moved to
+    if not run_command(["git", "fetch", "--depth=1", "--force", "origin", f"+HEAD:{tracking_ref}"], cwd=target_dir, quiet=True):
+        return "git fetch failed"
+    if not run_command(["git", "reset", "--hard", tracking_ref], cwd=target_dir, quiet=True):
+        return "git reset failed"
+    return None
+
+def _open_manifest():
+    """Read the manifest once, or None without logging or on a manifest error."""
+    if not LOGGING_AVAILABLE:
+        return None
+    try:
+        with _MANIFEST_LOCK:
+            return InstallLogger()
+    except Exception:
+        return None
+
+def _manifest_info(logger, name):
+    """The tool's manifest entry, or None without a manifest."""
+    if logger is None:
+        return None
+    with _MANIFEST_LOCK:
+        return logger.get_tool_info(name)
+
+def cached_components(name, head, target_dir, logger=None):
+    """Components and item lists recorded in the manifest, if discovered at this exact HEAD."""
+    if not head:
+        return None, {}
+    info = _manifest_info(logger, name)
+    if not info or info.get('components_head_sha') != head or not info.get('component_paths'):
+        return None, {}
+    
+    components = {c_type: target_dir / rel for c_type, rel in info['component_paths'].items()}
+    # Recorded directories can still vanish in a dirty checkout
+    if not all(path.is_dir() for path in components.values()):
+        return None, {}
+    items = {c_type: data.get('items', []) for c_type, data in (info.get('components') or {}).items()}
+    return components, items
+
+def install_tool(repo_url, name=None, only_clone=False, only_link=False, validate=True, backup=True, dry_run=False, interactive=False, full_history=False, logger=None):
+    """Clone or update a tool and link its components.
+
+    logger is an InstallLogger shared by parallel installs; without one the
+    manifest is read once, the first time it is needed.
+    """
     # Handle short GitHub format "user/repo"
     if not repo_url.startswith("http") and not repo_url.startswith("git@") and "/" in repo_url:
         repo_url = f"https://github.com/{repo_url}.git"
@@ -182,6 +598,9 @@ def install_tool(repo_url, name=None, only_clone=False, only_link=False, validat
     if name:
         # Explicit name provided (e.g. from update_all), trust it
         target_dir = TOOLS_DIR / name
+        # update_all passes a placeholder URL; record the real origin instead
+        if target_dir.exists():
+            repo_url = get_remote_url(target_dir) or repo_url
     else:
         # Smart detection logic
         default_name = repo_name_raw
@@ -189,16 +608,15 @@ def install_tool(repo_url, name=None, only_clone=False, only_link=False, validat
         
         if default_dir.exists():
             # Check if it's the same repo
-            existing_url = get_remote_url(default_dir)
+            # Prefer the URL recorded in the manifest over spawning git
+            if logger is None:
+                logger = _open_manifest()
+            existing_url = (_manifest_info(logger, default_name) or {}).get('url')
+            if not existing_url:
+                existing_url = get_remote_url(default_dir)
             
-            # Loose comparison (ignore .git, protocol) across both
-            clean_new = repo_url.replace(".git", "").lower()
-            clean_existing = (existing_url or "").replace(".git", "").lower()
-            
-            # Does existing url end with author/repo? or match completely?
-            match_suffix = f"/{author.lower()}/{repo_name_raw.lower()}"
-            
-            if clean_existing == clean_new or clean_existing.endswith(match_suffix):
+            # Loose comparison (ignore .git, protocol, case) across both
+            if existing_url and canonical_url(existing_url) == canonical_url(repo_url):
                 # It's the same repo, verify existing link
                 print(f"  🔍 Found existing repository at {default_name}")
                 target_name = default_name
@@ -215,24 +633,29 @@ def install_tool(repo_url, name=None, only_clone=False, only_link=False, validat
             target_name = default_name
             target_dir = default_dir
 
-    print(f"🔧 \033[1mProcessing {target_name}\033[0m ({repo_url})...")
+    print(_MESSAGES["processing"].format(target_name, repo_url))
     name = target_name
     
     # Dry-run preview
     if dry_run:
-        print(f"\n🔍 \033[1mDry-Run Preview\033[0m")
-        print(f"\nWould perform:")
+        out = OutputBuffer()
+        out(_MESSAGES["dry_run"])
+        out(f"\nWould perform:")
         if not only_link:
             if target_dir.exists():
-                print(f"  ✓ Update repository (git pull)")
+                if full_history:
+                    out(f"  ✓ Update repository (git pull)")
+                else:
+                    out(f"  ✓ Update repository (shallow fetch + reset to origin, unless the checkout was modified)")
             else:
-                print(f"  ✓ Clone repository to {target_dir}")
+                out(f"  ✓ Clone repository to {target_dir}")
         if not only_clone:
-            print(f"  ✓ Scan for components (skills, agents, commands, etc.)")
-            print(f"  ✓ Create symlinks for all environments")
-            print(f"  ✓ Run validation checks")
-        print(f"\nNo changes will be made in dry-run mode.")
-        print("-" * 50)
+            out(f"  ✓ Scan for components (skills, agents, commands, etc.)")
+            out(f"  ✓ Create symlinks for all environments")
+            out(f"  ✓ Run validation checks")
+        out(f"\nNo changes will be made in dry-run mode.")
+        out("-" * 50)
+        out.flush()
         return True
     
     # Interactive confirmation
@@ -244,15 +667,23 @@ def install_tool(repo_url, name=None, only_clone=False, only_link=False, validat
     
     # Clone or Pull
     if not TOOLS_DIR.exists(): TOOLS_DIR.mkdir(parents=True, exist_ok=True)
+    if logger is None:
+        logger = _open_manifest()
     
     if not only_link:
         if target_dir.exists():
             print(f"  ⬇️  Updating git repository...")
-            if not run_command("git pull", cwd=target_dir, quiet=True):
-                print("  ⚠️  Git pull failed (dirty state?), skipping update.")
+            if is_up_to_date(target_dir):
+                print("  ✓ Already up to date, skipping pull.")
+            else:
+                recorded_head = (_manifest_info(logger, name) or {}).get('components_head_sha')
+                reason = update_repository(target_dir, full_history, recorded_head)
+                if reason:
+                    print(f"  ⚠️  Git update skipped ({reason}), keeping the current checkout.")
         else:
             print(f"  ⬇️  Cloning repository...")
-            if not run_command(f"git clone {repo_url} {target_dir}", quiet=True):
+            clone_args = [] if full_history else ["--depth=1", "--single-branch"]
+            if not run_command(["git", "clone", *clone_args, repo_url, str(target_dir)], quiet=True):
                 print("  ❌ Clone failed.")
                 return
     
@@ -269,119 +700,152 @@ def install_tool(repo_url, name=None, only_clone=False, only_link=False, validat
         return True
 
     # Discovery & Linking
-    found_components = find_components(target_dir)
+    # An unchanged checkout reuses the components found last time instead of re-walking it
+    head = _local_head(target_dir)
+    cached_items = {}
+    found_components = None
+    root_files = None
+    if not only_link:
+        found_components, cached_items = cached_components(name, head, target_dir, logger)
+    if found_components is None:
+        root_files = set()
+        found_components = find_components(target_dir, root_files)
     installed_summary = {} # {type: {locations: [], items: []}}
 
     print("  🔗 Linking components...")
     if not found_components:
         print("     ⚠️  No standard components (skills, agents, etc.) found in root or subdirs.")
+    create_destination_dirs(found_components)
     
     for c_type, c_path in found_components.items():
         links = link_component(c_path, c_type, name)
         if links:
-            items = get_component_items(c_path, c_type)
+            items = cached_items.get(c_type)
+            if items is None:
+                items = get_component_items(c_path, c_type)
             installed_summary[c_type] = {'locations': links, 'items': items}
-            print(f"     ✅ Linked \033[36m{c_type}\033[0m from {c_path.relative_to(target_dir)}")
+            print(_MESSAGES["linked"].format(c_type, c_path.relative_to(target_dir)))
 
     # Summary Output
-    desc = get_tool_description(target_dir)
-    print(f"\n✨ \033[32mSuccessfully Installed {name}\033[0m")
-    print(f"📖 \033[3m{desc}\033[0m\n")
+    out = OutputBuffer()
+    desc = get_tool_description(target_dir, root_files)
+    out(_MESSAGES["installed"].format(name))
+    out(_MESSAGES["description"].format(desc))
     
-    print("🔎 \033[1mCapabilities Installed:\033[0m")
+    out(_MESSAGES["capabilities"])
     if not installed_summary:
-        print("   (No active components found. Is this a raw library?)")
+        out("   (No active components found. Is this a raw library?)")
     else:
         for c_type, data in installed_summary.items():
             item_list = ", ".join(data['items'][:5]) # Show first 5
             if len(data['items']) > 5: item_list += f", +{len(data['items'])-5} more"
-            print(f"   • \033[1m{c_type.capitalize()}\033[0m: {item_list if item_list else '(Standard link)'}")
+            out(_MESSAGES["capability"].format(c_type.capitalize(), item_list if item_list else '(Standard link)'))
             
-    print("\n🚀 \033[1mHow to Validate:\033[0m")
+    out(_MESSAGES["how_to_validate"])
     
     if "skills" in installed_summary and installed_summary["skills"]['items']:
         ex_skill = installed_summary["skills"]['items'][0]
-        print(f"   ▶ Skill: Ask \033[33m'Help me using {ex_skill}'\033[0m or run \033[33m/skill run {ex_skill}\033[0m")
+        out(_MESSAGES["skill_hint"].format(ex_skill))
     
     if "agents" in installed_summary and installed_summary["agents"]['items']:
         ex_agent = installed_summary["agents"]['items'][0]
-        print(f"   ▶ Agent: Type \033[33m@{ex_agent}\033[0m to switch to this agent.")
+        out(_MESSAGES["agent_hint"].format(ex_agent))
 
     if "commands" in installed_summary and installed_summary["commands"]['items']:
         ex_cmd = installed_summary["commands"]['items'][0]
-        print(f"   ▶ Command: Type \033[33m/{ex_cmd} --help\033[0m")
+        out(_MESSAGES["command_hint"].format(ex_cmd))
         
     if "plugins" in installed_summary:
-        print(f"   ▶ Check plugins: \033[33m/plugin list\033[0m")
+        out(_MESSAGES["plugin_hint"])
 
-    print("-" * 50)
+    out("-" * 50)
+    out.flush()
     
     # Phase 4: Validation (NEW)
-    if validate and VALIDATION_AVAILABLE and not only_clone:
-        print(f"\n🔍 \033[1mPhase 4: Validation\033[0m")
+    validation_passed = True
+    validation = _load_validation() if validate and not only_clone else None
+    if validation:
+        run_validation, _ = validation
+        print(_MESSAGES["validation"])
         validation_passed = run_validation(name)
         
         if not validation_passed:
-            print(f"\n❌ \033[31mValidation failed!\033[0m")
+            print(_MESSAGES["validation_failed"])
             print(f"   Installation completed but has issues.")
             print(f"   Review errors above and fix manually, or run:")
-            print(f"   \033[33mpython install_transaction.py rollback {name}\033[0m")
+            print(_MESSAGES["rollback_hint"].format(name))
             return False
         
-        print(f"\n✅ \033[32mValidation passed!\033[0m")
+        print(_MESSAGES["validation_passed"])
     
     # Phase 5: Logging (NEW)
-    if LOGGING_AVAILABLE and not only_clone:
+    if logger is not None and not only_clone:
         try:
-            logger = InstallLogger()
-            
-            # Extract version (git commit)
-            version = None
-            try:
-                import subprocess
-                result = subprocess.check_output(
-                    ["git", "rev-parse", "--short", "HEAD"],
-                    cwd=target_dir,
-                    stderr=subprocess.DEVNULL
-                )
-                version = result.decode().strip()
-            except:
-                pass
+            # Version is the short form of the HEAD read before discovery
+            version = head[:7] if head else None
             
             # Determine environments
-            environments = []
-            for env in ['opencode', 'codex', 'gemini']:
-                env_dir = Path.home() / f".{env if env != 'opencode' else 'config/opencode'}"
-                if env_dir.exists():
-                    environments.append(env)
+            environments = [env for env, _ in ACTIVE_ENVS]
             
-            # Log installation
-            logger.log_installation(
-                tool_name=name,
-                url=repo_url,
-                version=version,
-                validation_passed=validation_passed if validate else True,
-                environments=environments,
-                components=installed_summary
-            )
+            # Log installation (serialized, update_all_tools installs in parallel)
+            with _MANIFEST_LOCK:
+                logger.log_installation(
+                    tool_name=name,
+                    url=repo_url,
+                    version=version,
+                    validation_passed=validation_passed,
+                    environments=environments,
+                    components=installed_summary,
+                    components_head_sha=head,
+                    component_paths={t: str(p.relative_to(target_dir)) for t, p in found_components.items()}
+                )
         except Exception as e:
             print(f"  ⚠️  Logging failed: {e}")
     
     return True
 
-def update_all_tools():
+def update_all_tools(full_history=False):
     print(f"🚀 Batch Updating ALL tools in {TOOLS_DIR}...")
-    count = 0
+    items = []
     if TOOLS_DIR.exists():
-        for item in TOOLS_DIR.iterdir():
-            if item.is_dir() and (item / ".git").exists():
+        items = [item for item in TOOLS_DIR.iterdir() if item.is_dir() and (item / ".git").exists()]
+    
+    if items:
+        from concurrent.futures import ThreadPoolExecutor
+        
+        # One manifest shared by all installs, so parallel updates don't overwrite each other's
+        # entries, and written once when they are all done
+        logger = _open_manifest()
+        batch = logger.batch() if logger is not None else contextlib.nullcontext()
+        
+        # Updates are dominated by git network I/O, so run them in parallel
+        # and print each tool's output as one block once it is done
+        output = _ThreadOutput(sys.stdout)
+        sys.stdout = output
+        try:
+            # Git work is network-bound and releases the GIL, so oversubscribe the CPUs
+            workers = min(16, (os.cpu_count() or 1) * 4, len(items))
+            with batch, ThreadPoolExecutor(max_workers=workers) as executor:
                 # Re-install triggers update+link
                 # We construct a dummy URL since it exists
-                install_tool(f"local/{item.name}", name=item.name)
-                count += 1
-    print(f"🏁 Update checks completed for {count} tools.")
+                futures = [
+                    executor.submit(output.capture, install_tool, f"local/{item.name}", name=item.name,
+                                    full_history=full_history, logger=logger)
+                    for item in items
+                ]
+                for item, future in zip(items, futures):
+                    text, error = future.result()
+                    if error is not None:
+                        text += f"  ❌ Update failed for {item.name}: {error}\n"
+                    output.stream.write(text)
+        finally:
+            sys.stdout = output.stream
+    
+    print(f"🏁 Update checks completed for {len(items)} tools.")
 
 if __name__ == "__main__":
+    import argparse
+    
     parser = argparse.ArgumentParser(description="GitHub AI Tools Installer")
     parser.add_argument("url", nargs="?", help="GitHub Repository URL or user/repo")
     parser.add_argument("--all", action="store_true", help="Update all installed tools")
@@ -392,13 +856,16 @@ if __name__ == "__main__":
     parser.add_argument("--no-backup", dest='backup', action="store_false", help="Skip backup creation")
     parser.add_argument("--dry-run", action="store_true", help="Preview changes without executing")
     parser.add_argument("--interactive", action="store_true", help="Ask for confirmation before each step")
+    parser.add_argument("--full-history", action="store_true", help="Clone/pull full git history instead of a shallow checkout")
     args = parser.parse_args()
 
     if args.all:
-        update_all_tools()
+        update_all_tools(full_history=args.full_history)
     elif args.url:
         # Use transaction wrapper if available and not in clone-only mode
-        if VALIDATION_AVAILABLE and not args.only_clone and args.backup:
+        validation = _load_validation() if not args.only_clone and args.backup and not args.dry_run else None
+        if validation:
+            _, InstallTransaction = validation
             with InstallTransaction(args.url.split('/')[-1].replace('.git', ''), backup=args.backup) as tx:
                 success = install_tool(
                     args.url, 
@@ -407,7 +874,8 @@ if __name__ == "__main__":
                     validate=not args.no_validate,
                     backup=False,  # Transaction handles backup
                     dry_run=args.dry_run,
-                    interactive=args.interactive
+                    interactive=args.interactive,
+                    full_history=args.full_history
                 )
                 if success:
                     tx.commit()
@@ -420,7 +888,8 @@ if __name__ == "__main__":
                 validate=not args.no_validate,
                 backup=args.backup,
                 dry_run=args.dry_run,
-                interactive=args.interactive
+                interactive=args.interactive,
+                full_history=args.full_history
             )
     else:
         parser.print_help()
@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+AI Tools Installer - Shared Helpers
+
+JSON, YAML, cache and symlink helpers used by the other installer modules.
+"""
+
+import os
+import hashlib
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# Config subdirectories that may hold links into a tool
+LINK_TYPES = ('skills', 'agents', 'commands', 'hooks', 'plugins', 'mcp')
+
+# orjson reads and writes JSON several times faster, stdlib json otherwise
+try:
+    import orjson
+    def dumps(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+    dumps_compact = orjson.dumps
+    def dumps_line(obj) -> bytes:
+        return orjson.dumps(obj, option=orjson.OPT_APPEND_NEWLINE)
+    loads = orjson.loads
+except ImportError:
+    import json
+    def dumps(obj) -> bytes:
+        return json.dumps(obj, indent=2).encode()
+    def dumps_compact(obj) -> bytes:
+        return json.dumps(obj).encode()
+    def dumps_line(obj) -> bytes:
+        return json.dumps(obj).encode() + b'\n'
+    loads = json.loads
+
+
+def write_json(path: Path, obj):
+    """Write JSON atomically (temp file + rename), so readers never see a partial file"""
+    tmp_file = path.with_name(path.name + '.tmp')
+    tmp_file.write_bytes(dumps(obj))
+    os.replace(tmp_file, path)
+
+
+@lru_cache(maxsize=None)
+def yaml_loader(verbatim: bool = False):
+    """Import yaml on first use, preferring the libyaml-backed loaders.
+
+    The safe loader is returned by default. verbatim selects the base loader
+    instead, which keeps every scalar the string that was written.
+    """
+    import yaml
+    if verbatim:
+        return getattr(yaml, 'CBaseLoader', yaml.BaseLoader)
+    return getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+
+def tool_cache_file(cache_dir: Path, tool_dir: Path) -> Path:
+    """Get the cache file for a tool directory"""
+    key = hashlib.blake2b(str(tool_dir.resolve()).encode(), digest_size=16).hexdigest()
+    return cache_dir / f"{key}.json"
+
+
+def save_cache(cache_file: Path, obj):
+    """Save results for later runs, ignoring errors since caching is best-effort"""
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        cache_file.write_bytes(dumps_compact(obj))
+    except OSError:
+        pass
+
+
+def index_symlinks(config_dirs: Dict[str, Path], tools_dir: Path,
+                   link_types=LINK_TYPES) -> Dict[str, List[Tuple[str, Path, Path]]]:
+    """
+    Map each tool name to the links pointing into it, from one readlink per link.
+    
+    Returns:
+        {tool_name: [(env_name, link_path, target_path)]}
+    """
+    # Links name the tools directory by its literal or its resolved path (e.g. under a symlinked home)
+    tools_prefixes = {os.path.join(os.path.abspath(tools_dir), ''), os.path.join(os.path.realpath(tools_dir), '')}
+    index: Dict[str, List[Tuple[str, Path, Path]]] = {}
+    for env_name, config_dir in config_dirs.items():
+        for link_type in link_types:
+            link_dir = os.path.join(config_dir, link_type)
+            try:
+                with os.scandir(link_dir) as it:
+                    entries = [entry for entry in it if entry.is_symlink()]
+            except OSError:
+                continue
+            
+            for entry in entries:
+                try:
+                    target = os.path.normpath(os.path.join(link_dir, os.readlink(entry.path)))
+                except OSError:
+                    continue
+                
+                # The tool is the first path segment under the tools directory
+                prefix = next((p for p in tools_prefixes if target.startswith(p)), None)
+                if prefix is None:
+                    continue
+                tool_name = target[len(prefix):].split(os.sep, 1)[0]
+                index.setdefault(tool_name, []).append((env_name, Path(entry.path), Path(target)))
+    return index
@@ -6,12 +6,15 @@ Provides structured logging for all installation operations and maintains
 a manifest of installed tools.
 """
 
-import json
+from collections import defaultdict
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
 from typing import Optional, Dict, List
 from dataclasses import dataclass, asdict
 
+from install_common import loads, write_json
+
 @dataclass
 class ToolManifestEntry:
     """Represents an installed tool in the manifest"""
@@ -24,12 +27,16 @@ class ToolManifestEntry:
     validation_passed: bool = True
     environments: List[str] = None  # ['opencode', 'codex', 'gemini']
     components: Dict[str, List[str]] = None  # {'skills': ['skill1'], 'agents': ['agent1']}
+    components_head_sha: Optional[str] = None  # Full HEAD sha the components were discovered at
+    component_paths: Dict[str, str] = None  # {'skills': 'skills'}, relative to the tool directory
     
     def __post_init__(self):
         if self.environments is None:
             self.environments = []
         if self.components is None:
             self.components = {}
+        if self.component_paths is None:
+            self.component_paths = {}
 
 
 class InstallLogger:
@@ -44,26 +51,55 @@ class InstallLogger:
         
         self.manifest_file = self.logs_dir / 'manifest.json'
         self.manifest = self._load_manifest()
+        # name -> position in installed_tools, so lookups don't scan the list
+        self._index = {tool['name']: i for i, tool in enumerate(self.manifest['installed_tools'])}
+        # status -> entries, kept in sync as statuses change
+        self._by_status = defaultdict(list)
+        for tool in self.manifest['installed_tools']:
+            self._by_status[tool.get('status', 'unknown')].append(tool)
+        self._batch_depth = 0
+        self._dirty = False
     
     def _load_manifest(self) -> Dict:
         """Load the manifest file"""
         if self.manifest_file.exists():
             try:
-                return json.loads(self.manifest_file.read_text())
-            except json.JSONDecodeError:
+                return loads(self.manifest_file.read_bytes())
+            except ValueError:
                 print(f"⚠️  Corrupt manifest file, creating new one")
                 return {'installed_tools': [], 'last_updated': datetime.now().isoformat()}
         else:
             return {'installed_tools': [], 'last_updated': datetime.now().isoformat()}
     
     def _save_manifest(self):
-        """Save the manifest file"""
+        """Save the manifest file, or defer it until the current batch() ends"""
+        if self._batch_depth:
+            self._dirty = True
+            return
+        self.flush()
+    
+    def flush(self):
+        """Write the manifest atomically (temp file + rename)"""
         self.manifest['last_updated'] = datetime.now().isoformat()
-        self.manifest_file.write_text(json.dumps(self.manifest, indent=2))
+        write_json(self.manifest_file, self.manifest)
+        self._dirty = False
+    
+    @contextmanager
+    def batch(self):
+        """Group several updates into a single manifest write"""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth and self._dirty:
+                self.flush()
     
     def log_installation(self, tool_name: str, url: str, version: Optional[str] = None,
                         validation_passed: bool = True, environments: List[str] = None,
-                        components: Dict[str, List[str]] = None) -> str:
+                        components: Dict[str, List[str]] = None,
+                        components_head_sha: Optional[str] = None,
+                        component_paths: Optional[Dict[str, str]] = None) -> str:
         """
         Log a tool installation.
         
@@ -96,22 +132,21 @@ class InstallLogger:
         log_file.write_text('\n'.join(log_content))
         
         # Update manifest
-        self._update_manifest_entry(tool_name, url, version, validation_passed, environments, components)
+        self._update_manifest_entry(tool_name, url, version, validation_passed, environments, components,
+                                    components_head_sha, component_paths)
         
         return str(log_file)
     
     def _update_manifest_entry(self, tool_name: str, url: str, version: Optional[str],
                                validation_passed: bool, environments: List[str],
-                               components: Dict[str, List[str]]):
+                               components: Dict[str, List[str]],
+                               components_head_sha: Optional[str] = None,
+                               component_paths: Optional[Dict[str, str]] = None):
         """Update or create manifest entry for a tool"""
         now = datetime.now().isoformat()
         
         # Find existing entry
-        existing = None
-        for i, tool in enumerate(self.manifest['installed_tools']):
-            if tool['name'] == tool_name:
-                existing = i
-                break
+        existing = self._index.get(tool_name)
         
         if existing is not None:
             # Update existing
@@ -124,7 +159,10 @@ class InstallLogger:
                 entry['environments'] = environments
             if components:
                 entry['components'] = components
-            entry['status'] = 'active' if validation_passed else 'failed'
+            self._set_status(entry, 'active' if validation_passed else 'failed')
+            # Always overwrite, a stale sha must never outlive its discovery results
+            entry['components_head_sha'] = components_head_sha
+            entry['component_paths'] = component_paths or {}
         else:
             # Create new
             entry = ToolManifestEntry(
@@ -136,12 +174,27 @@ class InstallLogger:
                 status='active' if validation_passed else 'failed',
                 validation_passed=validation_passed,
                 environments=environments or [],
-                components=components or {}
+                components=components or {},
+                components_head_sha=components_head_sha,
+                component_paths=component_paths or {}
             )
-            self.manifest['installed_tools'].append(asdict(entry))
+            entry = asdict(entry)
+            self.manifest['installed_tools'].append(entry)
+            self._index[tool_name] = len(self.manifest['installed_tools']) - 1
+            self._by_status[entry['status']].append(entry)
         
         self._save_manifest()
     
+    def _set_status(self, entry: Dict, status: str):
+        """Change an entry's status and move it to the matching bucket"""
+        old_status = entry.get('status', 'unknown')
+        if old_status == status:
+            return
+        bucket = self._by_status[old_status]
+        bucket[:] = [t for t in bucket if t is not entry]
+        entry['status'] = status
+        self._by_status[status].append(entry)
+    
     def log_failure(self, tool_name: str, url: str, error_message: str):
         """Log a failed installation"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -166,10 +219,13 @@ class InstallLogger:
     
     def get_tool_info(self, tool_name: str) -> Optional[Dict]:
         """Get manifest entry for a tool"""
-        for tool in self.manifest['installed_tools']:
-            if tool['name'] == tool_name:
-                return tool
-        return None
+        i = self._index.get(tool_name)
+        return self.manifest['installed_tools'][i] if i is not None else None
+    
+    def get_url(self, tool_name: str) -> Optional[str]:
+        """Get the recorded repository URL for a tool, if any"""
+        info = self.get_tool_info(tool_name)
+        return info.get('url') if info else None
     
     def get_all_tools(self) -> List[Dict]:
         """Get all installed tools"""
@@ -177,17 +233,19 @@ class InstallLogger:
     
     def get_failed_installations(self) -> List[Dict]:
         """Get all failed installations"""
-        return [t for t in self.manifest['installed_tools'] if not t.get('validation_passed', True)]
+        return list(self._by_status['failed'])
     
     def mark_uninstalled(self, tool_name: str):
         """Mark a tool as uninstalled"""
-        for tool in self.manifest['installed_tools']:
-            if tool['name'] == tool_name:
-                tool['status'] = 'uninstalled'
-                tool['last_updated'] = datetime.now().isoformat()
-                self._save_manifest()
-                return True
-        return False
+        tool = self.get_tool_info(tool_name)
+        if tool is None:
+            return False
+        if tool.get('status') == 'uninstalled':
+            return True
+        self._set_status(tool, 'uninstalled')
+        tool['last_updated'] = datetime.now().isoformat()
+        self._save_manifest()
+        return True
 
 
 def format_history_output(tools: List[Dict], show_all: bool = False) -> str:
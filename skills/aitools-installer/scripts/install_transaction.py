@@ -5,13 +5,195 @@ AI Tools Installer - Transaction Management
 Provides atomic installations with automatic rollback on failure.
 """
 
-import shutil
-import json
+import os
+import sys
+import errno
+import functools
+from contextlib import contextmanager
 from pathlib import Path
 from datetime import datetime
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Tuple
 from dataclasses import dataclass, asdict
-import tempfile
+
+from install_common import dumps_line, index_symlinks, loads, write_json
+
+# Transaction logs are appended to one journal, one JSON record per line
+JOURNAL_FILE = 'transactions.jsonl'
+# tool name -> latest kept snapshot, so rollback_tool() doesn't have to glob for it
+SNAPSHOT_INDEX_FILE = 'latest-snapshots.json'
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+FICLONE = 0x40049409  # Linux ioctl: share all extents of one file with another
+
+# Errors meaning "this filesystem can't clone files", as opposed to a problem with one file
+_NO_REFLINK_ERRNOS = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.ENOSYS, errno.EINVAL, errno.ENOTTY}
+
+# st_dev -> whether reflinks work there, probed once per filesystem
+_reflink_support: Dict[int, bool] = {}
+_clonefile = None
+
+
+def _clone_file(src: str, dst: str):
+    """Create dst as a copy-on-write clone of src, raising OSError if that's not possible"""
+    global _clonefile
+    if sys.platform == 'darwin':
+        if _clonefile is None:
+            import ctypes
+            libsystem = ctypes.CDLL('/usr/lib/libSystem.dylib', use_errno=True)
+            _clonefile = libsystem.clonefile
+            _clonefile.argtypes = [ctypes.c_char_p, ctypes.c_char_p, ctypes.c_int]
+        if _clonefile(os.fsencode(src), os.fsencode(dst), 0) != 0:
+            import ctypes
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), dst)
+        return
+    
+    if fcntl is None:
+        raise OSError(errno.ENOSYS, "reflink not supported on this platform", dst)
+    src_fd = os.open(src, os.O_RDONLY)
+    try:
+        dst_fd = os.open(dst, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            fcntl.ioctl(dst_fd, FICLONE, src_fd)
+        except OSError:
+            os.close(dst_fd)
+            os.unlink(dst)
+            raise
+        os.close(dst_fd)
+    finally:
+        os.close(src_fd)
+
+
+def _reflink_supported(directory: Path) -> bool:
+    """Check (once per filesystem) whether files in directory can be reflinked"""
+    dev = os.stat(directory).st_dev
+    if dev not in _reflink_support:
+        import tempfile
+        supported = False
+        try:
+            with tempfile.TemporaryDirectory(dir=directory) as probe_dir:
+                src = os.path.join(probe_dir, 'src')
+                with open(src, 'wb') as f:
+                    f.write(b'reflink probe')
+                _clone_file(src, os.path.join(probe_dir, 'dst'))
+                supported = True
+        except OSError:
+            pass
+        _reflink_support[dev] = supported
+    return _reflink_support[dev]
+
+
+def _reflink_or_copy(src: str, dst: str, dev: int):
+    """Copy a file with its metadata, sharing extents with src where the filesystem allows"""
+    import shutil
+    if _reflink_support.get(dev):
+        try:
+            _clone_file(src, dst)
+            shutil.copystat(src, dst)
+            return
+        except OSError as e:
+            if e.errno in _NO_REFLINK_ERRNOS:
+                # The filesystem refuses, stop trying for the rest of the batch
+                _reflink_support[dev] = False
+            # Anything else is about this one file; let a plain copy deal with it
+    shutil.copy2(src, dst)
+
+
+def _copy_tree(src: Path, dst: Path):
+    """Copy a directory tree, using reflinks when the destination filesystem supports them.
+
+    Symlinks are copied as symlinks, so a restored tree is identical to the original.
+    """
+    import shutil
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    _reflink_supported(dst.parent)
+    dev = os.stat(dst.parent).st_dev
+    
+    # clonefile() clones a whole directory hierarchy in one call, touching only metadata
+    if sys.platform == 'darwin' and _reflink_support.get(dev):
+        try:
+            _clone_file(str(src), str(dst))
+            return
+        except OSError:
+            if dst.exists():
+                _fast_rmtree(dst)
+    
+    def copy_dir(src_dir: str, dst_dir: str):
+        os.mkdir(dst_dir)
+        with os.scandir(src_dir) as it:
+            for entry in it:
+                target = os.path.join(dst_dir, entry.name)
+                if entry.is_symlink():
+                    os.symlink(os.readlink(entry.path), target)
+                elif entry.is_dir():
+                    copy_dir(entry.path, target)
+                else:
+                    _reflink_or_copy(entry.path, target, dev)
+        shutil.copystat(src_dir, dst_dir)
+    
+    copy_dir(str(src), str(dst))
+
+
+def _fast_rmtree(path: Path):
+    """Delete a directory tree we own, unlinking relative to each directory's fd"""
+    if not hasattr(os, 'fwalk'):  # Windows
+        import shutil
+        shutil.rmtree(path)
+        return
+    
+    # Bottom-up, so every directory is empty by the time it's removed.
+    # No per-entry lstat like shutil.rmtree, and no path re-resolution per unlink.
+    for root, dirs, files, root_fd in os.fwalk(path, topdown=False):
+        for name in files:
+            os.unlink(name, dir_fd=root_fd)
+        for name in dirs:
+            try:
+                os.rmdir(name, dir_fd=root_fd)
+            except NotADirectoryError:
+                os.unlink(name, dir_fd=root_fd)  # Symlink to a directory
+    os.rmdir(path)
+
+
+def _load_snapshot_index(logs_dir: Path) -> Dict[str, Dict]:
+    """Load the latest-snapshot index, empty if missing or unreadable"""
+    try:
+        index = loads((logs_dir / SNAPSHOT_INDEX_FILE).read_bytes())
+    except (OSError, ValueError):
+        return {}
+    return index if isinstance(index, dict) else {}
+
+
+def _restore_symlink(link: str, target: str):
+    """Point link at target, replacing whatever is there (one readlink if it already does)"""
+    try:
+        if os.readlink(link) == target:
+            return
+    except OSError:
+        pass
+    
+    # Create the link under a temporary name and rename it over the old entry,
+    # instead of stat + unlink + symlink
+    tmp_name = os.path.join(os.path.dirname(link), f".{os.path.basename(link)}.tmp-{os.getpid()}")
+    try:
+        os.symlink(target, tmp_name)
+    except FileExistsError:
+        os.unlink(tmp_name)
+        os.symlink(target, tmp_name)
+    os.replace(tmp_name, link)
+
+
+def _frozen_clock(method):
+    """Run a transaction step with one clock reading shared by everything it logs"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._freeze_clock():
+            return method(self, *args, **kwargs)
+    return wrapper
+
 
 @dataclass
 class TransactionLog:
@@ -66,7 +248,24 @@ class InstallTransaction:
         )
         self.committed = False
         self.rolled_back = False
-        
+        self._clock_cache: Optional[datetime] = None
+    
+    @contextmanager
+    def _freeze_clock(self):
+        """Make _now() return the same time until the outermost block exits"""
+        if self._clock_cache is not None:
+            yield
+            return
+        self._clock_cache = datetime.now()
+        try:
+            yield
+        finally:
+            self._clock_cache = None
+    
+    def _now(self) -> datetime:
+        """Current time, or the frozen time inside a _freeze_clock() block"""
+        return self._clock_cache or datetime.now()
+    
     def __enter__(self):
         """Start transaction"""
         print(f"🔄 Starting transaction: {self.tool_name}")
@@ -97,6 +296,7 @@ class InstallTransaction:
         
         return False
     
+    @_frozen_clock
     def _create_snapshot(self):
         """Create backup snapshot of current installation"""
         print(f"  📸 Creating snapshot...")
@@ -105,51 +305,45 @@ class InstallTransaction:
         snapshot_base = self.tools_dir.parent / '.install-snapshots'
         snapshot_base.mkdir(exist_ok=True)
         
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        timestamp = self._now().strftime('%Y%m%d_%H%M%S')
         self.snapshot_dir = snapshot_base / f"{self.tool_name}_{timestamp}"
         
         # Backup tool directory
         if self.tool_path.exists():
-            shutil.copytree(self.tool_path, self.snapshot_dir / 'tool')
+            _copy_tree(self.tool_path, self.snapshot_dir / 'tool')
         
         # Backup symlinks
         symlinks_backup = {}
-        for env_name, config_dir in self.config_dirs.items():
-            env_links = []
-            for link_type in ['skills', 'agents', 'commands', 'hooks', 'plugins', 'mcp']:
-                link_dir = config_dir / link_type
-                if not link_dir.exists():
-                    continue
-                
-                for item in link_dir.iterdir():
-                    if item.is_symlink() and self.tool_name in str(item.resolve()):
-                        env_links.append({
-                            'link': str(item),
-                            'target': str(item.resolve())
-                        })
-            
-            if env_links:
-                symlinks_backup[env_name] = env_links
+        for env_name, link, target in self._tool_links():
+            symlinks_backup.setdefault(env_name, []).append({
+                'link': str(link),
+                'target': str(target)
+            })
         
         # Save symlinks info
         if symlinks_backup:
-            (self.snapshot_dir / 'symlinks.json').write_text(
-                json.dumps(symlinks_backup, indent=2)
-            )
+            write_json(self.snapshot_dir / 'symlinks.json', symlinks_backup)
         
         self.log.snapshot_path = str(self.snapshot_dir)
         self._log_operation('snapshot_created', {'path': str(self.snapshot_dir)})
+        # Indexed right away, so rollback_tool() finds it even if this process dies mid-install
+        self._update_snapshot_index(str(self.snapshot_dir))
         
         print(f"     Snapshot: {self.snapshot_dir}")
     
+    def _tool_links(self) -> List[Tuple[str, Path, Path]]:
+        """Links currently pointing into this tool, as (env_name, link, target)"""
+        return index_symlinks(self.config_dirs, self.tools_dir).get(self.tool_name, [])
+    
     def _log_operation(self, operation: str, details: Dict = None):
         """Log an operation"""
         self.log.operations.append({
             'operation': operation,
-            'timestamp': datetime.now().isoformat(),
+            'timestamp': self._now().isoformat(),
             'details': details or {}
         })
     
+    @_frozen_clock
     def commit(self):
         """Commit the transaction"""
         if self.rolled_back:
@@ -158,12 +352,13 @@ class InstallTransaction:
         print(f"\n✅ Committing transaction: {self.tool_name}")
         
         self.log.status = 'committed'
-        self.log.completed_at = datetime.now().isoformat()
+        self.log.completed_at = self._now().isoformat()
         self.committed = True
         
         # Save transaction log
         self._save_transaction_log()
     
+    @_frozen_clock
     def rollback(self):
         """Rollback the transaction"""
         if self.committed:
@@ -178,52 +373,33 @@ class InstallTransaction:
             # Restore tool directory
             tool_backup = self.snapshot_dir / 'tool'
             if tool_backup.exists():
-                if self.tool_path.exists():
-                    shutil.rmtree(self.tool_path)
-                shutil.copytree(tool_backup, self.tool_path)
+                self._restore_tool(tool_backup)
                 print(f"     Restored: {self.tool_path}")
             
             # Restore symlinks
             symlinks_file = self.snapshot_dir / 'symlinks.json'
             if symlinks_file.exists():
-                symlinks_data = json.loads(symlinks_file.read_text())
+                symlinks_data = loads(symlinks_file.read_bytes())
                 
                 for env_name, links in symlinks_data.items():
                     for link_info in links:
-                        link_path = Path(link_info['link'])
-                        target_path = Path(link_info['target'])
-                        
-                        # Remove current link if exists
-                        if link_path.exists() or link_path.is_symlink():
-                            link_path.unlink()
-                        
-                        # Recreate original link
-                        link_path.symlink_to(target_path)
+                        _restore_symlink(link_info['link'], link_info['target'])
                 
                 print(f"     Restored {len(symlinks_data)} symlink(s)")
         else:
             # No snapshot, just remove new files
             print(f"  🗑️  Removing newly installed files...")
             if self.tool_path.exists():
-                shutil.rmtree(self.tool_path)
+                _fast_rmtree(self.tool_path)
                 print(f"     Removed: {self.tool_path}")
             
             # Remove symlinks
-            for env_name, config_dir in self.config_dirs.items():
-                for link_type in ['skills', 'agents', 'commands', 'hooks', 'plugins', 'mcp']:
-                    link_dir = config_dir / link_type
-                    if not link_dir.exists():
-                        continue
-                    
-                    for item in link_dir.iterdir():
-                        if item.is_symlink():
-                            target = item.resolve()
-                            if self.tool_name in str(target):
-                                item.unlink()
-                                print(f"     Removed link: {item}")
+            for env_name, link, target in self._tool_links():
+                link.unlink()
+                print(f"     Removed link: {link}")
         
         self.log.status = 'rolled_back'
-        self.log.completed_at = datetime.now().isoformat()
+        self.log.completed_at = self._now().isoformat()
         self.rolled_back = True
         
         # Save transaction log
@@ -231,19 +407,56 @@ class InstallTransaction:
         
         print(f"  ✅ Rollback complete")
     
+    def _restore_tool(self, tool_backup: Path):
+        """Replace the tool directory with its snapshot copy"""
+        if not self.tool_path.exists():
+            _copy_tree(tool_backup, self.tool_path)
+            return
+        
+        # Move the current tree aside (one rename) and only delete it once the
+        # restore worked, so a failed restore can put it back
+        aside = self.tool_path.with_name(f".{self.tool_path.name}.rollback-{os.getpid()}")
+        os.rename(self.tool_path, aside)
+        try:
+            _copy_tree(tool_backup, self.tool_path)
+        except BaseException:
+            if self.tool_path.exists():
+                _fast_rmtree(self.tool_path)
+            os.rename(aside, self.tool_path)
+            raise
+        _fast_rmtree(aside)
+    
     def _cleanup_snapshot(self):
         """Clean up snapshot after successful commit"""
         if self.snapshot_dir and self.snapshot_dir.exists():
-            shutil.rmtree(self.snapshot_dir)
+            _fast_rmtree(self.snapshot_dir)
             print(f"  🧹 Cleaned up snapshot")
+        self._update_snapshot_index(None)
+    
+    def _update_snapshot_index(self, snapshot_path: Optional[str]):
+        """Record this tool's latest snapshot, or forget ours once it is cleaned up"""
+        logs_dir = self.tools_dir.parent / '.install-logs'
+        logs_dir.mkdir(exist_ok=True)
+        index = _load_snapshot_index(logs_dir)
+        if snapshot_path:
+            index[self.tool_name] = {'snapshot_path': snapshot_path}
+        elif index.get(self.tool_name, {}).get('snapshot_path') == str(self.snapshot_dir):
+            del index[self.tool_name]
+        else:
+            return
+        write_json(logs_dir / SNAPSHOT_INDEX_FILE, index)
     
     def _save_transaction_log(self):
-        """Save transaction log for audit trail"""
+        """Append transaction log to the journal for audit trail"""
         logs_dir = self.tools_dir.parent / '.install-logs'
         logs_dir.mkdir(exist_ok=True)
         
-        log_file = logs_dir / f"{self.tool_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        log_file.write_text(json.dumps(asdict(self.log), indent=2))
+        fd = os.open(logs_dir / JOURNAL_FILE, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, dumps_line(asdict(self.log)))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
 
 
 # Convenience function for manual rollback
@@ -258,6 +471,11 @@ def rollback_tool(tool_name: str, snapshot_path: str = None):
     tools_dir = Path.home() / '.config' / 'opencode' / 'tools'
     snapshot_base = tools_dir.parent / '.install-snapshots'
     
+    if not snapshot_path:
+        latest = _load_snapshot_index(tools_dir.parent / '.install-logs').get(tool_name)
+        if latest and Path(latest['snapshot_path']).exists():
+            snapshot_path = latest['snapshot_path']
+    
     if snapshot_path:
         snapshot_dir = Path(snapshot_path)
     else:
@@ -283,8 +501,6 @@ def rollback_tool(tool_name: str, snapshot_path: str = None):
 
 
 if __name__ == "__main__":
-    import sys
-    
     if len(sys.argv) < 2:
         print("Usage:")
         print("  python install_transaction.py rollback <tool_name> [snapshot_path]")
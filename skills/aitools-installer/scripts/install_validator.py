@@ -9,8 +9,16 @@ import sys
 from pathlib import Path
 from typing import List, Dict, Optional, Tuple
 from dataclasses import dataclass
+import os
 import re
-import yaml
+
+from install_common import index_symlinks, yaml_loader
+
+# Frontmatter is read in chunks of this size, giving up past the cap
+FRONTMATTER_CHUNK_BYTES = 8192
+FRONTMATTER_MAX_BYTES = 1 << 20
+
+_FRONTMATTER_OPEN_RE = re.compile(rb'---\s*\n')
 
 @dataclass
 class ValidationIssue:
@@ -64,6 +72,7 @@ class InstallValidator:
     
     def _validate_yaml_configs(self, tool_path: Path) -> List[ValidationIssue]:
         """Validate YAML frontmatter in agent/skill config files"""
+        import yaml
         issues = []
         
         # Find all .md files in agents/, skills/, etc.
@@ -72,19 +81,17 @@ class InstallValidator:
         for pattern in config_patterns:
             for config_file in tool_path.glob(pattern):
                 try:
-                    content = config_file.read_text(encoding='utf-8')
-                    
-                    # Extract YAML frontmatter (between --- markers)
-                    yaml_match = re.match(r'^---\s*\n(.*?)\n---', content, re.DOTALL)
+                    frontmatter = self._read_frontmatter(config_file)
                     
-                    if not yaml_match:
+                    if frontmatter is None:
                         continue  # No frontmatter, skip
                     
-                    yaml_content = yaml_match.group(1)
+                    head, start, end = frontmatter
+                    yaml_content = head[start:end].decode('utf-8')
                     
                     # Parse YAML
                     try:
-                        data = yaml.safe_load(yaml_content)
+                        data = yaml.load(yaml_content, Loader=yaml_loader())
                         
                         # Check for incompatible 'tools' array format
                         if 'tools' in data:
@@ -93,7 +100,7 @@ class InstallValidator:
                                     severity='error',
                                     category='compatibility',
                                     file_path=str(config_file),
-                                    line_number=self._find_line_number(content, 'tools:'),
+                                    line_number=self._frontmatter_line_number(head, end, b'tools:'),
                                     message='Incompatible tools format: Array found, expected Map/Dictionary',
                                     suggested_fix='Convert tools: [A, B] to tools:\\n  A: {}\\n  B: {}'
                                 ))
@@ -119,35 +126,59 @@ class InstallValidator:
         
         return issues
     
+    def _read_frontmatter(self, config_file: Path) -> Optional[Tuple[bytes, int, int]]:
+        """
+        Read just enough of a file to hold its YAML frontmatter (between --- markers).
+        
+        Returns:
+            (head, start, end) with the YAML at head[start:end], or None if there is none
+        """
+        with open(config_file, 'rb') as f:
+            head = f.read(FRONTMATTER_CHUNK_BYTES)
+            opening = _FRONTMATTER_OPEN_RE.match(head)
+            if not opening:
+                return None
+            start = opening.end()
+            
+            end = head.find(b'\n---', start)
+            while end < 0:
+                if len(head) >= FRONTMATTER_MAX_BYTES:
+                    return None
+                chunk = f.read(FRONTMATTER_CHUNK_BYTES)
+                if not chunk:
+                    return None
+                searched = len(head)
+                head += chunk
+                end = head.find(b'\n---', max(start, searched - 3))
+        
+        return head, start, end
+    
+    def _frontmatter_line_number(self, head: bytes, end: int, search: bytes) -> Optional[int]:
+        """Find line number of a string within the frontmatter"""
+        pos = head.find(search, 0, end)
+        if pos < 0:
+            return None
+        return head.count(b'\n', 0, pos) + 1
+    
     def _validate_symlinks(self, tool_name: str) -> List[ValidationIssue]:
         """Validate that created symlinks are valid"""
         issues = []
         
-        for env_name, config_dir in self.config_dirs.items():
-            # Check common symlink locations
-            link_types = ['skills', 'agents', 'commands', 'hooks', 'plugins']
-            
-            for link_type in link_types:
-                link_dir = config_dir / link_type
-                if not link_dir.exists():
-                    continue
-                
-                # Find symlinks for this tool
-                for item in link_dir.iterdir():
-                    if item.is_symlink():
-                        # Check if it's for our tool
-                        target = item.resolve()
-                        if tool_name in str(target):
-                            # Validate symlink
-                            if not target.exists():
-                                issues.append(ValidationIssue(
-                                    severity='error',
-                                    category='symlink',
-                                    file_path=str(item),
-                                    line_number=None,
-                                    message=f'Broken symlink: {item.name} → {target} (target does not exist)',
-                                    suggested_fix=f'Remove broken link: rm {item}'
-                                ))
+        # Check common symlink locations
+        link_types = ['skills', 'agents', 'commands', 'hooks', 'plugins']
+        links = index_symlinks(self.config_dirs, self.tools_dir, link_types).get(tool_name, [])
+        
+        for env_name, item, target in links:
+            # Validate symlink
+            if not os.path.exists(target):
+                issues.append(ValidationIssue(
+                    severity='error',
+                    category='symlink',
+                    file_path=str(item),
+                    line_number=None,
+                    message=f'Broken symlink: {item.name} → {target} (target does not exist)',
+                    suggested_fix=f'Remove broken link: rm {item}'
+                ))
         
         return issues
     
@@ -187,14 +218,6 @@ class InstallValidator:
                     ))
         
         return issues
-    
-    def _find_line_number(self, content: str, search_string: str) -> Optional[int]:
-        """Find line number of a string in content"""
-        lines = content.split('\n')
-        for i, line in enumerate(lines, 1):
-            if search_string in line:
-                return i
-        return None
 
 
 def run_validation(tool_name: str, tools_dir: Path = None, config_dirs: Dict[str, Path] = None) -> bool:
@@ -5,10 +5,19 @@ AI Tools Installer - Security Scanner
 Performs basic security checks on tools before installation.
 """
 
+import os
 import re
+import hashlib
+from bisect import bisect_right
+from functools import lru_cache
 from pathlib import Path
-from typing import List, Dict, Set, Tuple
-from dataclasses import dataclass
+from typing import List, Dict, Optional, Set, Tuple
+from dataclasses import dataclass, astuple
+
+from install_common import loads, tool_cache_file, save_cache
+
+# Per-file scan results are cached per tool directory and invalidated by mtime and size
+CACHE_DIR = Path.home() / '.cache' / 'aitools' / 'scan'
 
 @dataclass
 class SecurityIssue:
@@ -36,19 +45,42 @@ class SecurityScanner:
             (r'chmod\s+777', 'Insecure permissions: chmod 777'),
             (r'sudo\s+', 'Privilege escalation attempt'),
             (r'exec\s*\([^)]*\$', 'Code execution with variable'),
-            (r'\\$\\{[^}]*exec', 'Command substitution with exec'),
+            (r'\$\{[^}]*exec', 'Command substitution with exec'),
         ],
         'medium': [
             (r'rm\s+-rf\s+\$', 'Force delete with variable'),
-            (r'\\>\\s*/dev/null\\s+2>&1', 'Output suppression (hiding errors)'),
+            (r'>\s*/dev/null\s+2>&1', 'Output suppression (hiding errors)'),
             (r'nc\s+-[lep]', 'Netcat listening/execution'),
         ]
     }
     
+    # File types that are scanned as scripts
+    SCRIPT_SUFFIXES = ('.sh', '.bash', '.py', '.js')
+    
     def __init__(self, tool_dir: Path):
         self.tool_dir = tool_dir
         self.issues: List[SecurityIssue] = []
         self.permissions: Set[str] = set()
+        self._scripts: Optional[List[Path]] = None
+    
+    def _script_files(self) -> List[Path]:
+        """All script files in the tool, found with a single directory walk"""
+        if self._scripts is None:
+            found = []
+            pending = [str(self.tool_dir)]
+            while pending:
+                try:
+                    with os.scandir(pending.pop()) as it:
+                        for entry in it:
+                            if entry.is_dir(follow_symlinks=False):
+                                if entry.name != '.git':
+                                    pending.append(entry.path)
+                            elif entry.name.endswith(self.SCRIPT_SUFFIXES) and entry.is_file():
+                                found.append(Path(entry.path))
+                except OSError:
+                    continue
+            self._scripts = sorted(found)
+        return self._scripts
     
     def scan(self) -> List[SecurityIssue]:
         """Run security scan on the tool"""
@@ -58,40 +90,56 @@ class SecurityScanner:
         # Check for hooks (startup scripts)
         self._check_hooks()
         
-        # Analyze permissions requested
-        self._analyze_permissions()
-        
         return self.issues
     
     def _scan_scripts(self):
-        """Scan shell scripts and Python files for suspicious patterns"""
-        script_patterns = ['**/*.sh', '**/*.bash', '**/*.py', '**/*.js']
+        """Scan shell scripts and Python files for suspicious patterns and the permissions they need"""
+        cache_file = tool_cache_file(CACHE_DIR, self.tool_dir)
+        cached = self._load_cache(cache_file)
         
-        for pattern in script_patterns:
-            for script_file in self.tool_dir.glob(pattern):
-                if script_file.is_file():
-                    try:
-                        content = script_file.read_text()
-                        self._scan_content(script_file, content)
-                    except:
-                        pass  # Skip binary or unreadable files
-    
-    def _scan_content(self, file_path: Path, content: str):
-        """Scan file content for suspicious patterns"""
-        lines = content.split('\n')
+        entries = {}  # relative path -> [mtime_ns, size, issues, permissions]
+        results = {}
+        misses = []
+        for script_file in self._script_files():
+            relative_path = str(script_file.relative_to(self.tool_dir))
+            try:
+                st = script_file.stat()
+            except OSError:
+                continue
+            key = [st.st_mtime_ns, st.st_size]
+            entry = cached.get(relative_path)
+            if entry and entry[:2] == key:
+                results[relative_path] = ([SecurityIssue(*issue) for issue in entry[2]], entry[3])
+            else:
+                misses.append((str(script_file), relative_path))
+            entries[relative_path] = key
         
-        for severity, patterns in self.SUSPICIOUS_PATTERNS.items():
-            for pattern, description in patterns:
-                for i, line in enumerate(lines, 1):
-                    if re.search(pattern, line, re.IGNORECASE):
-                        self.issues.append(SecurityIssue(
-                            severity=severity,
-                            category='code_pattern',
-                            file_path=str(file_path.relative_to(self.tool_dir)),
-                            line_number=i,
-                            description=description,
-                            pattern=line.strip()
-                        ))
+        for (path, relative_path), result in zip(misses, _scan_files(misses)):
+            results[relative_path] = result
+        
+        for relative_path, key in entries.items():
+            issues, permissions = results[relative_path]
+            self.issues.extend(issues)
+            self.permissions.update(permissions)
+            key.append([astuple(issue) for issue in issues])
+            key.append(permissions)
+        
+        if misses or len(entries) != len(cached):
+            self._save_cache(cache_file, entries)
+    
+    def _load_cache(self, cache_file: Path) -> Dict[str, list]:
+        """Load cached per-file results, if they were produced by the current patterns"""
+        try:
+            data = loads(cache_file.read_bytes())
+            if data['patterns'] != _PATTERNS_KEY:
+                return {}
+            return dict(data['files'])
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+    
+    def _save_cache(self, cache_file: Path, entries: Dict[str, list]):
+        """Save per-file results for later runs"""
+        save_cache(cache_file, {'patterns': _PATTERNS_KEY, 'files': entries})
     
     def _check_hooks(self):
         """Check for hook scripts that run on startup"""
@@ -112,30 +160,136 @@ class SecurityScanner:
                         pattern=f'Hook: {hook_file.name}'
                     ))
     
-    def _analyze_permissions(self):
-        """Analyze what permissions the tool might need"""
-        # Check for network access patterns
-        for script_file in self.tool_dir.glob('**/*.{sh,py,js}'):
-            if script_file.is_file():
-                try:
-                    content = script_file.read_text()
-                    
-                    if re.search(r'(curl|wget|http|fetch|requests|axios)', content, re.IGNORECASE):
-                        self.permissions.add('network_access')
-                    
-                    if re.search(r'(rm|delete|unlink|shutil\\.rmtree)', content, re.IGNORECASE):
-                        self.permissions.add('file_deletion')
-                    
-                    if re.search(r'(write|create|mkdir|touch)', content, re.IGNORECASE):
-                        self.permissions.add('file_write')
-                except:
-                    pass
-    
     def get_permissions_report(self) -> List[str]:
         """Get list of permissions this tool requests"""
         return sorted(list(self.permissions))
 
 
+def _line_safe(pattern: str) -> str:
+    """Keep a single-line pattern from matching across newlines (\\s and [^...] would)"""
+    pattern = re.sub(r'(?<!\\)((?:\\\\)*)\[\^', r'\1[^\\n', pattern)
+    return re.sub(r'(?<!\\)((?:\\\\)*)\\s', r'\1[^\\S\\n]', pattern)
+
+
+_NEWLINE_RE = re.compile(r'\n')
+
+# Files with a NUL byte in their first block are treated as binary and skipped
+BINARY_SNIFF_BYTES = 4096
+
+# Below this many scripts a serial scan beats starting worker processes
+PARALLEL_SCAN_MIN_FILES = 32
+
+# Permission a script implies when it mentions any of these (.bash files are not checked)
+_PERMISSION_PATTERNS = (
+    ('network_access', re.compile(r'(curl|wget|http|fetch|requests|axios)', re.IGNORECASE)),
+    ('file_deletion', re.compile(r'(rm|delete|unlink|shutil\.rmtree)', re.IGNORECASE)),
+    ('file_write', re.compile(r'(write|create|mkdir|touch)', re.IGNORECASE)),
+)
+
+# Cached results are only valid for the pattern set that produced them
+_PATTERNS_KEY = hashlib.blake2b(
+    repr((SecurityScanner.SUSPICIOUS_PATTERNS, [p.pattern for _, p in _PERMISSION_PATTERNS])).encode(),
+    digest_size=8
+).hexdigest()
+
+@lru_cache(maxsize=None)
+def _compiled_patterns():
+    """
+    Compile the suspicious patterns on first use (once per process, workers included).
+    
+    Returns:
+        ([(severity, compiled pattern, description)] in report order,
+         all patterns as one alternation, used to find candidate lines in a single pass)
+    """
+    compiled = [
+        (severity, re.compile(pattern, re.IGNORECASE), description)
+        for severity, patterns in SecurityScanner.SUSPICIOUS_PATTERNS.items()
+        for pattern, description in patterns
+    ]
+    fused = re.compile(
+        '|'.join(f'(?:{_line_safe(pattern)})'
+                 for patterns in SecurityScanner.SUSPICIOUS_PATTERNS.values()
+                 for pattern, _ in patterns),
+        re.IGNORECASE | re.MULTILINE
+    )
+    return compiled, fused
+
+
+def _scan_text(relative_path: str, content: str) -> List[SecurityIssue]:
+    """Find suspicious patterns in a script's content"""
+    compiled_patterns, fused_pattern = _compiled_patterns()
+    
+    # One pass of the fused regex over the whole file finds the lines worth checking
+    line_starts = [0]
+    line_starts.extend(m.end() for m in _NEWLINE_RE.finditer(content))
+    candidates = []
+    for match in fused_pattern.finditer(content):
+        line_number = bisect_right(line_starts, match.start())
+        if not candidates or candidates[-1] != line_number:
+            candidates.append(line_number)
+    if not candidates:
+        return []
+
+    lines = {}
+    for n in candidates:
+        end = line_starts[n] - 1 if n < len(line_starts) else len(content)
+        lines[n] = content[line_starts[n - 1]:end]
+
+    # Then each pattern is checked on those lines only, one issue per (pattern, line) as before
+    issues = []
+    for severity, pattern, description in compiled_patterns:
+        for n in candidates:
+            line = lines[n]
+            if pattern.search(line):
+                issues.append(SecurityIssue(
+                    severity=severity,
+                    category='code_pattern',
+                    file_path=relative_path,
+                    line_number=n,
+                    description=description,
+                    pattern=line.strip()
+                ))
+    return issues
+
+
+def _scan_file(path: str, relative_path: str) -> Tuple[List[SecurityIssue], List[str]]:
+    """
+    Scan one script file (module-level so process pool workers can run it).
+    
+    Returns:
+        (issues, permissions)
+    """
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(BINARY_SNIFF_BYTES)
+            if b'\x00' in head:
+                return [], []  # Binary, don't read the rest
+            content = (head + f.read()).decode('utf-8')
+    except (OSError, UnicodeDecodeError):
+        return [], []  # Skip binary or unreadable files
+    
+    permissions = []
+    if not path.endswith('.bash'):
+        permissions = [name for name, pattern in _PERMISSION_PATTERNS if pattern.search(content)]
+    return _scan_text(relative_path, content), permissions
+
+
+def _scan_files(files: List[Tuple[str, str]]) -> List[Tuple[List[SecurityIssue], List[str]]]:
+    """Scan (path, relative_path) pairs, returning each file's (issues, permissions) in order"""
+    # Files are independent and regex work is CPU-bound, so large batches use all cores.
+    # Small ones aren't worth the worker startup cost.
+    if len(files) >= PARALLEL_SCAN_MIN_FILES:
+        from concurrent.futures import ProcessPoolExecutor
+        paths, relative_paths = zip(*files)
+        try:
+            with ProcessPoolExecutor() as executor:
+                return list(executor.map(_scan_file, paths, relative_paths, chunksize=8))
+        except (OSError, RuntimeError):
+            pass  # No usable process pool here, scan serially below
+    
+    return [_scan_file(path, relative_path) for path, relative_path in files]
+
+
 def scan_tool_security(tool_dir: Path) -> Tuple[List[SecurityIssue], List[str]]:
     """
     Scan a tool for security issues.